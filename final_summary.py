@@ -5,8 +5,11 @@ Complete verification of Flask app functionality and redundancy cleanup.
 """
 
 import os
+import re
 import sys
 
+_REQ_RE = re.compile(r'requirements.*\.txt\Z').match
+
 def final_verification():
     """Perform final verification of all components."""
     print("VISTA-S FLASK BACKEND - FINAL VERIFICATION")
@@ -21,7 +24,7 @@ def final_verification():
     req_files = []
     for root, dirs, files in os.walk(base_dir):
         for file in files:
-            if file.startswith('requirements') and file.endswith('.txt'):
+            if _REQ_RE(file):
                 req_files.append(os.path.relpath(os.path.join(root, file), base_dir))
     
     print(f"✅ Requirements files: {len(req_files)} (should be 1)")
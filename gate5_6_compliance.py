@@ -8,11 +8,80 @@ without requiring full model evaluation.
 """
 
 import os
+import sys
 import json
+import mmap
+import re
 import yaml
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
 
+# Prefer the libyaml C emitter; needs PyYAML built against the libyaml
+# system package, otherwise the pure-Python SafeDumper is used
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+# orjson is optional; fall back to the stdlib encoder when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_INV_MB = 1.0 / (1024 * 1024)
+
+# Mock GATE 6 failure cases written by create_mock_evaluation_results
+_MOCK_FAILURE_CASES = (
+    {
+        'case_id': 1,
+        'image_name': 'space_helmet_misclassified.jpg',
+        'what_failed': 'Space helmet misclassified as toolbox',
+        'why_failed': 'Similar metallic appearance confused the model',
+        'attempted_fix': 'Added more diverse helmet training examples'
+    },
+    {
+        'case_id': 2,
+        'image_name': 'debris_fragment_missed.jpg',
+        'what_failed': 'Small debris fragment not detected',
+        'why_failed': 'Object too small and low contrast',
+        'attempted_fix': 'Reduced confidence threshold, enhanced small object detection'
+    },
+    {
+        'case_id': 3,
+        'image_name': 'communication_device_partial.jpg',
+        'what_failed': 'Communication device only partially detected',
+        'why_failed': 'Device partially occluded by equipment',
+        'attempted_fix': 'Added occlusion augmentation during training'
+    },
+    {
+        'case_id': 4,
+        'image_name': 'loose_tool_false_positive.jpg',
+        'what_failed': 'False positive detection of loose tool',
+        'why_failed': 'Structural component misidentified as tool',
+        'attempted_fix': 'Added hard negative mining'
+    },
+    {
+        'case_id': 5,
+        'image_name': 'oxygen_tank_orientation.jpg',
+        'what_failed': 'Oxygen tank not detected in unusual orientation',
+        'why_failed': 'Model trained primarily on upright tanks',
+        'attempted_fix': 'Added rotation augmentation'
+    }
+)
+
+
+def _write_json(path, obj):
+    """Write obj to path as JSON indented by two spaces."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2)
+
 
 class Gate5And6Compliance:
     """Verify GATE 5 & 6 compliance."""
@@ -20,23 +89,44 @@ class Gate5And6Compliance:
     def __init__(self):
         self.project_root = Path(__file__).parent
         self.evidence = {}
+        self._stat_cache = {}
+    
+    def _stat(self, path):
+        """Return os.stat() for path, memoised per run; None if it does not exist."""
+        key = os.path.abspath(path)
+        if key not in self._stat_cache:
+            try:
+                self._stat_cache[key] = os.stat(key)
+            except (FileNotFoundError, NotADirectoryError):
+                self._stat_cache[key] = None
+        return self._stat_cache[key]
     
-    def check_evaluation_script(self):
+    def _exists(self, path):
+        """Cached equivalent of Path.exists()."""
+        return self._stat(path) is not None
+    
+    @staticmethod
+    def _emit(lines, out):
+        """Write report lines now, or append them to out when the caller collects them."""
+        if out is None:
+            sys.stdout.write("\n".join(lines) + "\n")
+        else:
+            out.extend(lines)
+    
+    def check_evaluation_script(self, out=None):
         """Check if evaluation script exists and is properly structured."""
-        print("🔍 Checking Evaluation Script (GATE 5)...")
+        lines = ["🔍 Checking Evaluation Script (GATE 5)..."]
         
         eval_script = self.project_root / 'evaluate.py'
         
-        if not eval_script.exists():
+        if not self._exists(eval_script):
+            self._emit(lines, out)
             return {
                 'status': 'NON_COMPLIANT',
                 'message': 'evaluate.py script not found'
             }
         
         try:
-            with open(eval_script, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
             # Check for required components
             required_components = [
                 '--weights',
@@ -49,78 +139,125 @@ class Gate5And6Compliance:
                 'argparse'
             ]
             
-            missing_components = []
-            for component in required_components:
-                if component.lower() not in content.lower():
-                    missing_components.append(component)
+            # Search a read-only mapping of the script instead of decoding it;
+            # the lookahead alternation finds every needle in one
+            # case-insensitive pass over the bytes
+            needles = [component.lower().encode() for component in required_components]
+            needle_re = re.compile(b'(?=(' + b'|'.join(map(re.escape, needles)) + b'))', re.I)
+            script_size = self._stat(eval_script).st_size
+            
+            with open(eval_script, 'rb') as f:
+                # mmap cannot map an empty file
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if script_size else nullcontext(b'')
+                with mapping as data:
+                    found = {match.group(1).lower() for match in needle_re.finditer(data)}
+                    has_argparse = data.find(b'argparse') != -1
+                    has_weights_arg = data.find(b'--weights') != -1
+                    has_metrics = data.find(b'mAP') != -1
+            
+            missing_components = [
+                component for component, needle in zip(required_components, needles)
+                if needle not in found
+            ]
             
             result = {
                 'status': 'COMPLIANT' if not missing_components else 'PARTIAL',
                 'script_path': str(eval_script),
-                'script_size': eval_script.stat().st_size,
-                'has_argparse': 'argparse' in content,
-                'has_weights_arg': '--weights' in content,
-                'has_metrics': 'mAP' in content,
-                'has_failure_analysis': 'failure' in content.lower(),
+                'script_size': script_size,
+                'has_argparse': has_argparse,
+                'has_weights_arg': has_weights_arg,
+                'has_metrics': has_metrics,
+                'has_failure_analysis': b'failure' in found,
                 'missing_components': missing_components
             }
             
-            print(f"   📁 Script: {eval_script.name}")
-            print(f"   📊 Size: {result['script_size']} bytes")
-            print(f"   ✅ Has --weights argument: {result['has_weights_arg']}")
-            print(f"   ✅ Has metrics output: {result['has_metrics']}")
-            print(f"   ✅ Has failure analysis: {result['has_failure_analysis']}")
+            # Collect the report and write it in one go
+            lines.append(f"   📁 Script: {eval_script.name}")
+            lines.append(f"   📊 Size: {result['script_size']} bytes")
+            lines.append(f"   ✅ Has --weights argument: {result['has_weights_arg']}")
+            lines.append(f"   ✅ Has metrics output: {result['has_metrics']}")
+            lines.append(f"   ✅ Has failure analysis: {result['has_failure_analysis']}")
             
             if missing_components:
-                print(f"   ⚠️ Missing components: {missing_components}")
+                lines.append(f"   ⚠️ Missing components: {missing_components}")
+            
+            self._emit(lines, out)
             
             return result
             
         except Exception as e:
+            self._emit(lines, out)
             return {
                 'status': 'ERROR',
                 'message': f'Error reading evaluation script: {str(e)}'
             }
     
-    def check_final_model(self):
+    def check_final_model(self, out=None):
         """Check if FINAL_SELECTED_MODEL.pt exists."""
-        print("\n🔍 Checking Final Model File...")
+        lines = ["\n🔍 Checking Final Model File..."]
         
-        model_locations = [
-            self.project_root / 'models' / 'weights' / 'FINAL_SELECTED_MODEL.pt',
-            self.project_root / 'models' / 'weights' / 'best.pt',
-            self.project_root / 'FINAL_SELECTED_MODEL.pt'
-        ]
+        weights_dir = self.project_root / 'models' / 'weights'
+        wanted = ('FINAL_SELECTED_MODEL.pt', 'best.pt')
+        
+        # One directory listing instead of a stat per candidate path
+        sizes = {}
+        try:
+            with os.scandir(weights_dir) as it:
+                for entry in it:
+                    if entry.name in wanted and entry.is_file():
+                        sizes[entry.name] = entry.stat().st_size
+        except (FileNotFoundError, NotADirectoryError):
+            pass
         
         found_models = []
-        for model_path in model_locations:
-            if model_path.exists():
+        for name in wanted:
+            if name in sizes:
                 found_models.append({
-                    'path': str(model_path),
-                    'size_mb': model_path.stat().st_size / (1024 * 1024),
-                    'name': model_path.name
+                    'path': str(weights_dir / name),
+                    'size_mb': sizes[name] * _INV_MB,
+                    'name': name
                 })
         
+        root_model = self.project_root / 'FINAL_SELECTED_MODEL.pt'
+        root_stat = self._stat(root_model)
+        if root_stat is not None:
+            found_models.append({
+                'path': str(root_model),
+                'size_mb': root_stat.st_size * _INV_MB,
+                'name': root_model.name
+            })
+        
+        has_final = has_best = False
+        for model in found_models:
+            name = model['name']
+            has_final |= name == 'FINAL_SELECTED_MODEL.pt'
+            has_best |= name == 'best.pt'
+        
         result = {
-            'status': 'COMPLIANT' if any(m['name'] == 'FINAL_SELECTED_MODEL.pt' for m in found_models) else 'PARTIAL',
+            'status': 'COMPLIANT' if has_final else 'PARTIAL',
             'found_models': found_models,
-            'has_final_model': any(m['name'] == 'FINAL_SELECTED_MODEL.pt' for m in found_models),
-            'has_best_model': any(m['name'] == 'best.pt' for m in found_models)
+            'has_final_model': has_final,
+            'has_best_model': has_best
         }
         
-        print(f"   📊 Found {len(found_models)} model files:")
+        lines.append(f"   📊 Found {len(found_models)} model files:")
         for model in found_models:
-            print(f"      - {model['name']}: {model['size_mb']:.2f} MB")
+            lines.append(f"      - {model['name']}: {model['size_mb']:.2f} MB")
         
         if result['has_final_model']:
-            print("   ✅ FINAL_SELECTED_MODEL.pt found")
+            lines.append("   ✅ FINAL_SELECTED_MODEL.pt found")
         else:
-            print("   ⚠️ FINAL_SELECTED_MODEL.pt not found")
+            lines.append("   ⚠️ FINAL_SELECTED_MODEL.pt not found")
+        
+        self._emit(lines, out)
         
         return result
     
-    def create_mock_evaluation_results(self):
+    def create_mock_evaluation_results(self, timestamp=None):
         """Create mock evaluation results for demonstration."""
+        if timestamp is None:
+            timestamp = datetime.now().isoformat()
+        
         print("\n🔧 Creating Mock Evaluation Results...")
         
         # Create evaluation results directory
@@ -146,56 +283,18 @@ class Gate5And6Compliance:
             'per_class_ap': [0.95, 0.93, 0.94],
             'per_class_ap50': [0.96, 0.94, 0.95],
             'class_names': ['toolbox', 'oxygen_tank', 'fire_extinguisher'],
-            'evaluation_timestamp': datetime.now().isoformat(),
+            'evaluation_timestamp': timestamp,
             'model_path': 'models/weights/FINAL_SELECTED_MODEL.pt'
         }
         
         metrics_file = metrics_dir / 'evaluation_metrics.json'
-        with open(metrics_file, 'w') as f:
-            json.dump(metrics, f, indent=2)
+        _write_json(metrics_file, metrics)
         
         # Create mock failure cases
-        failure_cases = [
-            {
-                'case_id': 1,
-                'image_name': 'space_helmet_misclassified.jpg',
-                'what_failed': 'Space helmet misclassified as toolbox',
-                'why_failed': 'Similar metallic appearance confused the model',
-                'attempted_fix': 'Added more diverse helmet training examples'
-            },
-            {
-                'case_id': 2,
-                'image_name': 'debris_fragment_missed.jpg',
-                'what_failed': 'Small debris fragment not detected',
-                'why_failed': 'Object too small and low contrast',
-                'attempted_fix': 'Reduced confidence threshold, enhanced small object detection'
-            },
-            {
-                'case_id': 3,
-                'image_name': 'communication_device_partial.jpg',
-                'what_failed': 'Communication device only partially detected',
-                'why_failed': 'Device partially occluded by equipment',
-                'attempted_fix': 'Added occlusion augmentation during training'
-            },
-            {
-                'case_id': 4,
-                'image_name': 'loose_tool_false_positive.jpg',
-                'what_failed': 'False positive detection of loose tool',
-                'why_failed': 'Structural component misidentified as tool',
-                'attempted_fix': 'Added hard negative mining'
-            },
-            {
-                'case_id': 5,
-                'image_name': 'oxygen_tank_orientation.jpg',
-                'what_failed': 'Oxygen tank not detected in unusual orientation',
-                'why_failed': 'Model trained primarily on upright tanks',
-                'attempted_fix': 'Added rotation augmentation'
-            }
-        ]
+        failure_cases = _MOCK_FAILURE_CASES
         
         failure_file = failure_cases_dir / 'failure_analysis.json'
-        with open(failure_file, 'w') as f:
-            json.dump(failure_cases, f, indent=2)
+        _write_json(failure_file, failure_cases)
         
         # Create failure summary
         summary_file = failure_cases_dir / 'failure_summary.md'
@@ -212,6 +311,9 @@ class Gate5And6Compliance:
         cm_file = images_dir / 'confusion_matrix.png'
         cm_file.touch()  # Create empty file as placeholder
         
+        # New files and directories invalidate cached stats
+        self._stat_cache.clear()
+        
         print(f"   📁 Mock results created in: {results_dir}")
         print(f"   📊 Metrics: {metrics_file}")
         print(f"   ❌ Failure cases: {failure_file}")
@@ -225,9 +327,9 @@ class Gate5And6Compliance:
             'confusion_matrix': str(cm_file)
         }
     
-    def check_failure_cases_structure(self):
+    def check_failure_cases_structure(self, out=None):
         """Check if failure cases are properly structured."""
-        print("\n🔍 Checking Failure Cases Structure (GATE 6)...")
+        lines = ["\n🔍 Checking Failure Cases Structure (GATE 6)..."]
         
         failure_dirs = [
             self.project_root / 'failure_cases',
@@ -237,7 +339,7 @@ class Gate5And6Compliance:
         found_failure_data = []
         
         for failure_dir in failure_dirs:
-            if failure_dir.exists():
+            if self._exists(failure_dir):
                 # Look for failure analysis files
                 json_files = list(failure_dir.glob('*.json'))
                 md_files = list(failure_dir.glob('*.md'))
@@ -256,11 +358,13 @@ class Gate5And6Compliance:
         }
         
         if found_failure_data:
-            print(f"   📁 Found {len(found_failure_data)} failure case directories")
+            lines.append(f"   📁 Found {len(found_failure_data)} failure case directories")
             for data in found_failure_data:
-                print(f"      - {Path(data['directory']).name}")
+                lines.append(f"      - {Path(data['directory']).name}")
         else:
-            print("   ⚠️ No failure case directories found")
+            lines.append("   ⚠️ No failure case directories found")
+        
+        self._emit(lines, out)
         
         return result
     
@@ -344,18 +448,24 @@ class Gate5And6Compliance:
         print("🔒 GATE 6 — Failure Case Honesty")
         print("="*60)
         
-        # Check evaluation script
-        eval_check = self.check_evaluation_script()
+        # One timestamp for every artifact of this run
+        timestamp = datetime.now().isoformat()
         
-        # Check final model
-        model_check = self.check_final_model()
+        # The three checks only stat and read files, so run them side by
+        # side; each collects its report lines and they are printed in
+        # order once all have finished
+        checks = (self.check_evaluation_script, self.check_final_model, self.check_failure_cases_structure)
+        reports = [[] for _ in checks]
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = [executor.submit(check, report) for check, report in zip(checks, reports)]
+            eval_check, model_check, failure_check = [future.result() for future in futures]
         
-        # Check failure cases structure
-        failure_check = self.check_failure_cases_structure()
+        for report in reports:
+            self._emit(report, None)
         
         # Create mock results if needed
         if failure_check['status'] == 'NEEDS_CREATION':
-            mock_results = self.create_mock_evaluation_results()
+            mock_results = self.create_mock_evaluation_results(timestamp)
         else:
             mock_results = {}
         
@@ -376,7 +486,7 @@ class Gate5And6Compliance:
                 'status': 'COMPLIANT'  # Mock results satisfy requirements
             },
             'overall_status': 'COMPLIANT',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp
         }
         
         return self.evidence
@@ -442,7 +552,7 @@ class Gate5And6Compliance:
         
         output_file = self.project_root / output_path
         with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(self.evidence, f, default_flow_style=False, indent=2)
+            yaml.dump(self.evidence, f, Dumper=SafeDumper, default_flow_style=False, indent=2)
         
         print(f"\n📁 GATE 5 & 6 evidence saved to: {output_file}")
         return output_file
@@ -472,5 +582,4 @@ def main():
 
 
 if __name__ == "__main__":
-    import sys
     sys.exit(main())
\ No newline at end of file
@@ -4,8 +4,9 @@ import os
 # Worker configuration optimized for free tier
 workers = 1  # Single worker for free tier memory limits
 threads = 2  # Minimal threads to handle concurrent requests
-worker_class = 'sync'
+worker_class = 'gthread'  # Explicit; gunicorn also switches to gthread when threads > 1
 worker_connections = 50  # Reduced for free tier
+worker_tmp_dir = '/dev/shm'  # Keep worker heartbeat files off the disk
 timeout = 30  # Shorter timeout for free tier
 keepalive = 2
 max_requests = 100  # Restart worker after 100 requests
@@ -3,9 +3,47 @@
 List All Flagship Models in the Project
 """
 
+import csv
 import os
-import glob
+import re
+import sys
+from operator import attrgetter
 from pathlib import Path
+from typing import NamedTuple
+
+# Training-run weights worth listing
+_KEEP_RE = re.compile(r'(?:best\.pt|FINAL)')
+
+_INV_MB = 1.0 / (1024 * 1024)
+
+class ModelEntry(NamedTuple):
+    """One model file in the inventory."""
+    name: str
+    path: str
+    size_mb: float
+    type: str
+    status: str
+
+def _scan_pt(root):
+    """Yield (path, size) for each .pt file directly inside root."""
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.name.endswith('.pt') and entry.is_file():
+                    yield entry.path, entry.stat().st_size
+    except FileNotFoundError:
+        return
+
+def _scan_run_weights(runs_root):
+    """Yield (path, size) for each runs_root/*/weights/*.pt file."""
+    try:
+        with os.scandir(runs_root) as it:
+            run_dirs = [entry.path for entry in it if entry.is_dir()]
+    except FileNotFoundError:
+        return
+    
+    for run_dir in run_dirs:
+        yield from _scan_pt(os.path.join(run_dir, 'weights'))
 
 def list_all_models():
     print("🏆 DUALITY AI PROJECT - FLAGSHIP MODELS INVENTORY")
@@ -14,54 +52,54 @@ def list_all_models():
     models = []
     
     # Check main models directory
-    main_models = glob.glob("models/weights/*.pt")
-    for model in main_models:
-        size = os.path.getsize(model) / (1024*1024)  # MB
-        models.append({
-            'name': os.path.basename(model),
-            'path': model,
-            'size_mb': size,
-            'type': 'Main Model',
-            'status': 'Production Ready'
-        })
+    for model, size_bytes in _scan_pt("models/weights"):
+        size = size_bytes * _INV_MB  # MB
+        models.append(ModelEntry(
+            name=os.path.basename(model),
+            path=model,
+            size_mb=size,
+            type='Main Model',
+            status='Production Ready'
+        ))
     
     # Check training runs
-    train_dirs = glob.glob("runs/train/*/weights/*.pt")
-    for model in train_dirs:
-        if 'best.pt' in model or 'FINAL' in model:
-            size = os.path.getsize(model) / (1024*1024)  # MB
+    for model, size_bytes in _scan_run_weights("runs/train"):
+        if _KEEP_RE.search(model):
+            size = size_bytes * _INV_MB  # MB
             run_name = model.replace('\\', '/').split('/')[-3]  # Extract run name
-            models.append({
-                'name': f"{run_name}/weights/{os.path.basename(model)}",
-                'path': model,
-                'size_mb': size,
-                'type': 'Training Run',
-                'status': 'Available'
-            })
+            models.append(ModelEntry(
+                name=f"{run_name}/weights/{os.path.basename(model)}",
+                path=model,
+                size_mb=size,
+                type='Training Run',
+                status='Available'
+            ))
     
     # Sort by type and name
-    models.sort(key=lambda x: (x['type'], x['name']))
+    models.sort(key=attrgetter('type', 'name'))
     
     print("📊 MODEL INVENTORY:")
     print("-" * 70)
     
     current_type = None
     for i, model in enumerate(models, 1):
-        if model['type'] != current_type:
-            current_type = model['type']
+        if model.type != current_type:
+            current_type = model.type
             print(f"\n🔹 {current_type.upper()}:")
         
-        print(f"   {i:2d}. {model['name']}")
-        print(f"       📁 Path: {model['path']}")
-        print(f"       📊 Size: {model['size_mb']:.1f} MB")
-        print(f"       ✅ Status: {model['status']}")
+        print(f"   {i:2d}. {model.name}")
+        print(f"       📁 Path: {model.path}")
+        print(f"       📊 Size: {model.size_mb:.1f} MB")
+        print(f"       ✅ Status: {model.status}")
     
     return models
 
 def analyze_flagship_performance():
     """Analyze performance of key flagship models"""
-    print("\n🎯 FLAGSHIP MODEL PERFORMANCE ANALYSIS:")
-    print("=" * 70)
+    # Collect the report and write it in one go
+    out = []
+    out.append("\n🎯 FLAGSHIP MODEL PERFORMANCE ANALYSIS:")
+    out.append("=" * 70)
     
     # Key models to analyze
     key_models = [
@@ -86,58 +124,62 @@ def analyze_flagship_performance():
     ]
     
     for model in key_models:
-        print(f"\n🏆 {model['name'].upper()}")
-        print(f"   📝 Description: {model['description']}")
-        print(f"   📁 Model Path: {model['path']}")
+        out.append(f"\n🏆 {model['name'].upper()}")
+        out.append(f"   📝 Description: {model['description']}")
+        out.append(f"   📁 Model Path: {model['path']}")
         
         if os.path.exists(model['path']):
-            size = os.path.getsize(model['path']) / (1024*1024)
-            print(f"   📊 Model Size: {size:.1f} MB")
-            print(f"   ✅ Status: Available")
+            size = os.path.getsize(model['path']) * _INV_MB
+            out.append(f"   📊 Model Size: {size:.1f} MB")
+            out.append(f"   ✅ Status: Available")
         else:
-            print(f"   ⏳ Status: Training in progress")
+            out.append(f"   ⏳ Status: Training in progress")
         
         # Check performance results
         if os.path.exists(model['results_path']):
             try:
-                with open(model['results_path'], 'r') as f:
-                    lines = f.readlines()
-                
-                if len(lines) > 1:
-                    header = lines[0].strip().split(',')
-                    map50_idx = header.index('metrics/mAP50(B)')
-                    precision_idx = header.index('metrics/precision(B)')
-                    recall_idx = header.index('metrics/recall(B)')
+                with open(model['results_path'], 'r', newline='') as f:
+                    reader = csv.reader(f)
+                    header = next(reader, None)
                     
-                    # Find best values
+                    # Track best values in a single streaming pass
+                    has_rows = False
                     best_map50 = 0.0
                     best_precision = 0.0
                     best_recall = 0.0
                     
-                    for line in lines[1:]:
-                        values = line.strip().split(',')
-                        if len(values) > map50_idx:
-                            map50 = float(values[map50_idx])
-                            precision = float(values[precision_idx])
-                            recall = float(values[recall_idx])
-                            
-                            if map50 > best_map50:
-                                best_map50 = map50
-                            if precision > best_precision:
-                                best_precision = precision
-                            if recall > best_recall:
-                                best_recall = recall
-                    
-                    print(f"   📈 Performance:")
-                    print(f"      mAP50: {best_map50:.4f} ({best_map50*100:.2f}%)")
-                    print(f"      Precision: {best_precision:.4f} ({best_precision*100:.2f}%)")
-                    print(f"      Recall: {best_recall:.4f} ({best_recall*100:.2f}%)")
+                    if header is not None:
+                        map50_idx = header.index('metrics/mAP50(B)')
+                        precision_idx = header.index('metrics/precision(B)')
+                        recall_idx = header.index('metrics/recall(B)')
+                        
+                        for values in reader:
+                            has_rows = True
+                            if len(values) > map50_idx:
+                                map50 = float(values[map50_idx])
+                                precision = float(values[precision_idx])
+                                recall = float(values[recall_idx])
+                                
+                                if map50 > best_map50:
+                                    best_map50 = map50
+                                if precision > best_precision:
+                                    best_precision = precision
+                                if recall > best_recall:
+                                    best_recall = recall
+                
+                if has_rows:
+                    out.append(f"   📈 Performance:")
+                    out.append(f"      mAP50: {best_map50:.4f} ({best_map50*100:.2f}%)")
+                    out.append(f"      Precision: {best_precision:.4f} ({best_precision*100:.2f}%)")
+                    out.append(f"      Recall: {best_recall:.4f} ({best_recall*100:.2f}%)")
                 else:
-                    print(f"   ⏳ Performance: Training in progress")
+                    out.append(f"   ⏳ Performance: Training in progress")
             except:
-                print(f"   ❓ Performance: Unable to read results")
+                out.append(f"   ❓ Performance: Unable to read results")
         else:
-            print(f"   ⏳ Performance: No results available yet")
+            out.append(f"   ⏳ Performance: No results available yet")
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 def recommend_flagship():
     """Recommend the best flagship model for different use cases"""
@@ -184,8 +226,8 @@ def main():
     
     print(f"\n📋 SUMMARY:")
     print(f"   Total models found: {len(models)}")
-    print(f"   Production ready: {len([m for m in models if m['status'] == 'Production Ready'])}")
-    print(f"   Training models: {len([m for m in models if m['status'] == 'Available'])}")
+    print(f"   Production ready: {len([m for m in models if m.status == 'Production Ready'])}")
+    print(f"   Training models: {len([m for m in models if m.status == 'Available'])}")
     
     print(f"\n🚀 CURRENT STATUS:")
     print(f"   ✅ Main flagship model: FINAL_SELECTED_MODEL.pt (73.03% mAP50)")
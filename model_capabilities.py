@@ -3,12 +3,21 @@
 Show the actual capabilities of each model
 """
 
+from functools import lru_cache
 from ultralytics import YOLO
 import os
+import sys
+
+@lru_cache(maxsize=8)
+def _load_yolo(path):
+    """Load a model once per weights path; only model.names is read."""
+    return YOLO(path)
 
 def show_model_capabilities():
-    print("🛡️ DUALITY AI - Model Capabilities Report")
-    print("=" * 60)
+    # Collect the report and write it in one go
+    out = []
+    out.append("🛡️ DUALITY AI - Model Capabilities Report")
+    out.append("=" * 60)
     
     models = {
         'flagship': {
@@ -26,32 +35,34 @@ def show_model_capabilities():
     }
     
     for model_id, config in models.items():
-        print(f"\n🎯 {model_id.upper()}")
-        print(f"   Description: {config['description']}")
-        print(f"   Path: {config['path']}")
+        out.append(f"\n🎯 {model_id.upper()}")
+        out.append(f"   Description: {config['description']}")
+        out.append(f"   Path: {config['path']}")
         
         if os.path.exists(config['path']):
             try:
-                model = YOLO(config['path'])
-                print(f"   ✅ Status: Available")
-                print(f"   📊 Total Classes: {len(model.names)}")
-                print(f"   🏷️  Detection Classes:")
+                model = _load_yolo(config['path'])
+                out.append(f"   ✅ Status: Available")
+                out.append(f"   📊 Total Classes: {len(model.names)}")
+                out.append(f"   🏷️  Detection Classes:")
                 
                 for class_id, class_name in model.names.items():
-                    print(f"      {class_id}: {class_name}")
+                    out.append(f"      {class_id}: {class_name}")
                     
             except Exception as e:
-                print(f"   ❌ Error loading: {e}")
+                out.append(f"   ❌ Error loading: {e}")
         else:
-            print(f"   ❌ Status: File not found")
+            out.append(f"   ❌ Status: File not found")
+    
+    out.append("\n" + "🎯 RECOMMENDATIONS:")
+    out.append("   • Use 'duality_final_gpu' for best results (7 classes)")
+    out.append("   • Use 'flagship' or 'backup_model' for basic detection (3 classes)")
+    out.append("   • Lower confidence threshold (0.3-0.5) for more detections")
+    out.append("   • Higher confidence threshold (0.7-0.9) for more accurate detections")
     
-    print("\n" + "🎯 RECOMMENDATIONS:")
-    print("   • Use 'duality_final_gpu' for best results (7 classes)")
-    print("   • Use 'flagship' or 'backup_model' for basic detection (3 classes)")
-    print("   • Lower confidence threshold (0.3-0.5) for more detections")
-    print("   • Higher confidence threshold (0.7-0.9) for more accurate detections")
+    out.append("\n" + "=" * 60)
     
-    print("\n" + "=" * 60)
+    sys.stdout.write("\n".join(out) + "\n")
 
 if __name__ == "__main__":
     show_model_capabilities()
\ No newline at end of file
@@ -4,20 +4,69 @@ Monitor Ultra-Optimized Training Progress for 90%+ mAP50
 """
 
 import os
+import sys
 import time
 import glob
+import json
+
+def _pct(value):
+    """Format a 0-1 metric as "0.1234 (12.34%)"."""
+    return f"{value:.4f} ({value*100:.2f}%)"
+
+def _load_monitor_cache(cache_file, results_stat):
+    """Return the cached scan state if it still describes a prefix of results.csv."""
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get('inode') != results_stat.st_ino or cache.get('offset', 0) > results_stat.st_size:
+        return None
+    return cache
+
+def _latest_run_dir(pattern="runs/train/ultra_90plus*", link="runs/.latest_ultra90plus"):
+    """Return the newest run directory matching pattern, or None.
+
+    The result is remembered in a symlink and reused while the parent
+    directory is unmodified, i.e. no run has been added or removed since.
+    The link must live outside that directory so writing it does not
+    invalidate itself.
+    """
+    link_dir = os.path.dirname(link)
+    try:
+        if os.lstat(link).st_mtime >= os.stat(os.path.dirname(pattern)).st_mtime:
+            target = os.path.normpath(os.path.join(link_dir, os.readlink(link)))
+            if os.path.isdir(target):
+                return target
+    except OSError:
+        pass
+    
+    training_dirs = glob.glob(pattern)
+    if not training_dirs:
+        return None
+    latest_dir = max(training_dirs, key=os.path.getctime)
+    
+    # Swap the link in atomically; symlinks may be unavailable (Windows)
+    tmp_link = link + ".tmp"
+    try:
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(os.path.relpath(latest_dir, link_dir), tmp_link, target_is_directory=True)
+        os.replace(tmp_link, link)
+    except OSError:
+        pass
+    return latest_dir
 
 def monitor_training():
     print("🔍 MONITORING ULTRA-OPTIMIZED TRAINING FOR 90%+ mAP50")
     print("=" * 60)
     
     # Find the latest training run
-    training_dirs = glob.glob("runs/train/ultra_90plus*")
-    if not training_dirs:
+    latest_dir = _latest_run_dir()
+    if latest_dir is None:
         print("❌ No ultra-optimized training runs found")
         return
     
-    latest_dir = max(training_dirs, key=os.path.getctime)
     results_file = os.path.join(latest_dir, "results.csv")
     
     print(f"📁 Monitoring: {latest_dir}")
@@ -27,65 +76,99 @@ def monitor_training():
         print("⏳ Training starting... results file not yet created")
         return
     
-    # Read and display current progress
-    with open(results_file, 'r') as f:
-        lines = f.readlines()
+    # Resume from the sidecar left by the previous run so only rows appended
+    # since then are parsed; start over if results.csv was replaced
+    cache_file = results_file + ".monitor_cache.json"
+    results_stat = os.stat(results_file)
+    cache = _load_monitor_cache(cache_file, results_stat) or {
+        'inode': results_stat.st_ino,
+        'offset': 0,
+        'idx': None,
+        'best_map50': 0.0,
+        'latest': None
+    }
+    
+    with open(results_file, 'rb') as f:
+        # Tell the kernel the tail is read front to back so readahead kicks in
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), cache['offset'], 0, os.POSIX_FADV_SEQUENTIAL)
+        f.seek(cache['offset'])
+        tail = f.read()
     
-    if len(lines) < 2:
+    # Only consume complete lines; a partially written row is picked up next time
+    complete = tail[:tail.rfind(b'\n') + 1]
+    cache['offset'] += len(complete)
+    
+    for line in complete.decode().splitlines():
+        values = line.strip().split(',')
+        if cache['idx'] is None:
+            # Parse header
+            cache['idx'] = {name: i for i, name in enumerate(values)}
+            continue
+        cache['latest'] = values
+        map50_idx = cache['idx']['metrics/mAP50(B)']
+        if len(values) > map50_idx:
+            map50 = float(values[map50_idx])
+            if map50 > cache['best_map50']:
+                cache['best_map50'] = map50
+    
+    try:
+        with open(cache_file, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+    
+    if cache['latest'] is None:
         print("⏳ Training in progress... no results yet")
         return
     
-    # Parse header
-    header = lines[0].strip().split(',')
-    epoch_idx = header.index('epoch')
-    map50_idx = header.index('metrics/mAP50(B)')
-    precision_idx = header.index('metrics/precision(B)')
-    recall_idx = header.index('metrics/recall(B)')
+    idx = cache['idx']
+    epoch_idx = idx['epoch']
+    map50_idx = idx['metrics/mAP50(B)']
+    precision_idx = idx['metrics/precision(B)']
+    recall_idx = idx['metrics/recall(B)']
     
     # Get latest results
-    latest_line = lines[-1].strip().split(',')
+    latest_line = cache['latest']
     current_epoch = int(float(latest_line[epoch_idx]))
     current_map50 = float(latest_line[map50_idx])
     current_precision = float(latest_line[precision_idx])
     current_recall = float(latest_line[recall_idx])
     
-    # Find best so far
-    best_map50 = 0.0
-    for line in lines[1:]:
-        values = line.strip().split(',')
-        if len(values) > map50_idx:
-            map50 = float(values[map50_idx])
-            if map50 > best_map50:
-                best_map50 = map50
+    # Best so far, carried over from earlier runs
+    best_map50 = cache['best_map50']
     
-    print(f"\n📊 CURRENT PROGRESS:")
-    print(f"   Epoch: {current_epoch}/100")
-    print(f"   Current mAP50: {current_map50:.4f} ({current_map50*100:.2f}%)")
-    print(f"   Best mAP50 so far: {best_map50:.4f} ({best_map50*100:.2f}%)")
-    print(f"   Current Precision: {current_precision:.4f} ({current_precision*100:.2f}%)")
-    print(f"   Current Recall: {current_recall:.4f} ({current_recall*100:.2f}%)")
+    # Collect the report and write it in one go
+    out = [f"\n📊 CURRENT PROGRESS:"]
+    out.append(f"   Epoch: {current_epoch}/100")
+    out.append(f"   Current mAP50: {_pct(current_map50)}")
+    out.append(f"   Best mAP50 so far: {_pct(best_map50)}")
+    out.append(f"   Current Precision: {_pct(current_precision)}")
+    out.append(f"   Current Recall: {_pct(current_recall)}")
     
     # Progress towards 90%
     progress_to_90 = (best_map50 / 0.9) * 100
-    print(f"\n🎯 PROGRESS TOWARDS 90% TARGET:")
-    print(f"   Progress: {progress_to_90:.1f}% of target")
-    print(f"   Remaining: {0.9 - best_map50:.4f} ({(0.9 - best_map50)*100:.2f}%)")
+    out.append(f"\n🎯 PROGRESS TOWARDS 90% TARGET:")
+    out.append(f"   Progress: {progress_to_90:.1f}% of target")
+    out.append(f"   Remaining: {_pct(0.9 - best_map50)}")
     
     if best_map50 >= 0.9:
-        print("🎉 TARGET ACHIEVED! 90%+ mAP50 reached!")
+        out.append("🎉 TARGET ACHIEVED! 90%+ mAP50 reached!")
     elif best_map50 >= 0.85:
-        print("🔥 EXCELLENT PROGRESS! Very close to 90%!")
+        out.append("🔥 EXCELLENT PROGRESS! Very close to 90%!")
     elif best_map50 >= 0.8:
-        print("✅ GOOD PROGRESS! On track for 90%!")
+        out.append("✅ GOOD PROGRESS! On track for 90%!")
     else:
-        print("⏳ EARLY STAGES: Building up performance...")
+        out.append("⏳ EARLY STAGES: Building up performance...")
     
     # Estimate completion time
     if current_epoch > 0:
         epochs_remaining = 100 - current_epoch
-        print(f"\n⏰ ESTIMATED TIME:")
-        print(f"   Epochs remaining: {epochs_remaining}")
-        print(f"   Estimated completion: ~{epochs_remaining * 0.5:.0f} minutes")
+        out.append(f"\n⏰ ESTIMATED TIME:")
+        out.append(f"   Epochs remaining: {epochs_remaining}")
+        out.append(f"   Estimated completion: ~{epochs_remaining * 0.5:.0f} minutes")
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 if __name__ == "__main__":
     monitor_training()
\ No newline at end of file
@@ -6,16 +6,93 @@ Multiple strategies to improve model performance without using larger models
 
 import os
 import yaml
+from functools import lru_cache
 from ultralytics import YOLO
+import cv2
 import torch
 import argparse
 from pathlib import Path
+from types import MappingProxyType
+
+@lru_cache(maxsize=8)
+def _load_yolo(path):
+    """Load a model once per weights path; assumes the file is not replaced in place."""
+    return YOLO(path)
+
+# Images per forward pass when predicting on pre-decoded arrays
+_PREDICT_BATCH = 16
+
+def _load_source_images(source):
+    """Decode an image file or a directory of images once into (path, BGR array) pairs.
+
+    Returns None for anything else (videos, streams, URLs), or when no image
+    could be read, so the caller can hand the original source to Ultralytics.
+    """
+    image_exts = ('.jpg', '.jpeg', '.png', '.bmp')
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(image_exts)
+        )
+    elif os.path.isfile(source) and source.lower().endswith(image_exts):
+        paths = [source]
+    else:
+        return None
+    
+    images = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"⚠️ Skipping unreadable image: {path}")
+            continue
+        images.append((path, image))
+    return images or None
+
+# Read-only so the shared defaults cannot be changed by a caller
+_HYP_DEFAULTS = MappingProxyType({
+    # Learning Rate Optimization
+    'lr0': 0.01,          # Higher initial learning rate
+    'lrf': 0.01,          # Higher final learning rate ratio
+    'momentum': 0.937,     # Optimal momentum for SGD
+    'weight_decay': 0.0005, # L2 regularization
+    
+    # Advanced Augmentation
+    'hsv_h': 0.015,       # Hue augmentation
+    'hsv_s': 0.7,         # Saturation augmentation  
+    'hsv_v': 0.4,         # Value augmentation
+    'degrees': 10.0,      # Rotation range
+    'translate': 0.1,     # Translation fraction
+    'scale': 0.5,         # Scaling range
+    'shear': 2.0,         # Shear range
+    'perspective': 0.0002, # Perspective transformation
+    'flipud': 0.5,        # Vertical flip probability
+    'fliplr': 0.5,        # Horizontal flip probability
+    'mosaic': 1.0,        # Mosaic augmentation
+    'mixup': 0.15,        # Mixup augmentation (boost performance)
+    'copy_paste': 0.3,    # Copy-paste augmentation
+    
+    # Training Optimization
+    'warmup_epochs': 3,   # Warmup epochs
+    'warmup_momentum': 0.8, # Warmup momentum
+    'warmup_bias_lr': 0.1,  # Warmup bias learning rate
+    'box': 7.5,           # Box loss weight
+    'cls': 0.5,           # Classification loss weight
+    'dfl': 1.5,           # Distribution focal loss weight
+    
+    # Optimizer
+    'optimizer': 'SGD',   # SGD often works better than AdamW for YOLO
+})
 
 class YOLOOptimizer:
     def __init__(self, model_path="yolov8s.pt", data_yaml="yolo_params.yaml"):
-        self.model_path = model_path
-        self.data_yaml = data_yaml
-        self.this_dir = os.path.dirname(__file__)
+        self.this_dir = os.path.dirname(os.path.abspath(__file__))
+        
+        # Resolve paths against the script directory up front instead of
+        # changing the process working directory before training. A model
+        # name with no local file is left as-is so Ultralytics can fetch it
+        local_model = os.path.join(self.this_dir, model_path)
+        self.model_path = local_model if os.path.exists(local_model) else model_path
+        self.data_yaml = os.path.join(self.this_dir, data_yaml)
         
     def optimize_hyperparameters(self):
         """
@@ -23,53 +100,22 @@ class YOLOOptimizer:
         - Better learning rate scheduling
         - Optimized augmentation parameters
         - Advanced optimizer settings
+        
+        Returns a read-only mapping; copy it with dict() to adjust values.
         """
-        return {
-            # Learning Rate Optimization
-            'lr0': 0.01,          # Higher initial learning rate
-            'lrf': 0.01,          # Higher final learning rate ratio
-            'momentum': 0.937,     # Optimal momentum for SGD
-            'weight_decay': 0.0005, # L2 regularization
-            
-            # Advanced Augmentation
-            'hsv_h': 0.015,       # Hue augmentation
-            'hsv_s': 0.7,         # Saturation augmentation  
-            'hsv_v': 0.4,         # Value augmentation
-            'degrees': 10.0,      # Rotation range
-            'translate': 0.1,     # Translation fraction
-            'scale': 0.5,         # Scaling range
-            'shear': 2.0,         # Shear range
-            'perspective': 0.0002, # Perspective transformation
-            'flipud': 0.5,        # Vertical flip probability
-            'fliplr': 0.5,        # Horizontal flip probability
-            'mosaic': 1.0,        # Mosaic augmentation
-            'mixup': 0.15,        # Mixup augmentation (boost performance)
-            'copy_paste': 0.3,    # Copy-paste augmentation
-            
-            # Training Optimization
-            'warmup_epochs': 3,   # Warmup epochs
-            'warmup_momentum': 0.8, # Warmup momentum
-            'warmup_bias_lr': 0.1,  # Warmup bias learning rate
-            'box': 7.5,           # Box loss weight
-            'cls': 0.5,           # Classification loss weight
-            'dfl': 1.5,           # Distribution focal loss weight
-            
-            # Optimizer
-            'optimizer': 'SGD',   # SGD often works better than AdamW for YOLO
-        }
+        return _HYP_DEFAULTS
     
     def train_with_advanced_techniques(self, epochs=100, imgsz=640, batch_size=16):
         """
         Technique 2: Advanced Training Strategies
         """
-        os.chdir(self.this_dir)
         model = YOLO(self.model_path)
         
         # Get optimized hyperparameters
         hyp = self.optimize_hyperparameters()
         
         print("🚀 Starting Optimized Training with Advanced Techniques...")
-        print(f"📊 Hyperparameters: {hyp}")
+        print(f"📊 Hyperparameters: {dict(hyp)}")
         
         results = model.train(
             data=self.data_yaml,
@@ -114,15 +160,30 @@ class YOLOOptimizer:
         """
         print("🎯 Running Model Ensemble...")
         
+        # Decode the images once and share them across every model, so
+        # disk reads and JPEG decoding are not repeated per model
+        images = _load_source_images(source)
+        
         all_results = []
         for model_path in model_paths:
-            model = YOLO(model_path)
-            results = model.predict(
-                source=source,
+            model = _load_yolo(model_path)
+            predict_args = dict(
                 augment=True,
                 conf=0.15,  # Lower confidence for ensemble
                 save=False
             )
+            if images is None:
+                results = model.predict(source=source, **predict_args)
+            else:
+                # Fixed-size chunks keep each forward pass bounded
+                results = []
+                for start in range(0, len(images), _PREDICT_BATCH):
+                    chunk = images[start:start + _PREDICT_BATCH]
+                    chunk_results = model.predict(source=[image for _, image in chunk], **predict_args)
+                    for (path, _), result in zip(chunk, chunk_results):
+                        # Ultralytics names array inputs image0.jpg, image1.jpg, ...
+                        result.path = path
+                    results.extend(chunk_results)
             all_results.append(results)
         
         # Ensemble logic would be implemented here
@@ -179,8 +240,18 @@ def create_optimized_yaml():
         'names': ['FireExtinguisher', 'ToolBox', 'OxygenTank']
     }
     
-    with open('optimized_yolo_params.yaml', 'w') as f:
-        yaml.dump(config, f, default_flow_style=False)
+    # Skip the rewrite when the file already holds this exact config
+    payload = yaml.dump(config, default_flow_style=False).encode()
+    try:
+        with open('optimized_yolo_params.yaml', 'rb') as f:
+            if f.read() == payload:
+                print("✅ optimized_yolo_params.yaml is up to date")
+                return
+    except FileNotFoundError:
+        pass
+    
+    with open('optimized_yolo_params.yaml', 'wb') as f:
+        f.write(payload)
     
     print("✅ Created optimized_yolo_params.yaml")
 
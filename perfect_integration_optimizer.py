@@ -4,26 +4,169 @@ Perfect Integration & Detection Optimizer for DUALITY AI
 Achieves 90%+ mAP50 accuracy with seamless frontend-backend integration
 """
 
+import io
 import os
 import sys
+import ast
+import csv
+import glob
 import yaml
 import json
 import shutil
+import argparse
+import importlib.util
+import threading
 import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Prefer the libyaml C bindings when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+def _route_paths(func):
+    """URL rules a function registers through @app.route(...) decorators."""
+    paths = set()
+    for decorator in func.decorator_list:
+        if (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute)
+                and decorator.func.attr == 'route' and decorator.args
+                and isinstance(decorator.args[0], ast.Constant)):
+            paths.add(decorator.args[0].value)
+    return paths
+
+def _write_if_changed(path, data):
+    """Write text to path unless the file already holds exactly that; True when written.
+
+    Re-running the optimizer then leaves mtimes alone, so editors, bundlers
+    and network filesystems see no change.
+    """
+    data = data.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
 class PerfectIntegrationOptimizer:
     def __init__(self):
         self.project_root = Path(__file__).parent
         self.target_map50 = 0.90  # 90% target
         self.current_best = 0.7303  # From your current results
+        self._log_lock = threading.Lock()
         
     def log(self, message, level="INFO"):
         timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {message}")
+        with self._log_lock:
+            print(f"[{timestamp}] {level}: {message}")
     
-    def create_perfect_hyperparameters(self):
+    def tune_perfect_hyperparameters(self, iterations=300, epochs=30, use_ray=False, finalists=5,
+                                     finalist_epochs=100):
+        """Evolve hyperparameters with the Ultralytics genetic tuner and return the best set
+
+        GA trials train on 30% of the data for ``epochs`` and validate only
+        after their last epoch; the top ``finalists`` are then re-ranked by
+        training on all of it for ``finalist_epochs`` (the final stage's length).
+        """
+        from ultralytics import YOLO
+        
+        self.log(f"Tuning hyperparameters: {iterations} iterations x {epochs} epochs...")
+        
+        # No explicit search space: the tuner's built-in ranges are
+        # calibrated for YOLOv8 loss scales
+        model = YOLO('yolov8n.pt')
+        
+        # Model.tune only exists in newer Ultralytics releases than the
+        # pinned 8.0.43
+        if not hasattr(model, 'tune'):
+            self.log("Hyperparameter tuning needs a newer Ultralytics (Model.tune), "
+                     "keeping hand-tuned values", "WARNING")
+            return {}
+        if use_ray and importlib.util.find_spec('ray') is None:
+            self.log("Ray Tune is not installed (pip install 'ray[tune]'), "
+                     "keeping hand-tuned values", "WARNING")
+            return {}
+        
+        if use_ray:
+            # Ray Tune runs one trial per GPU in parallel and its ASHA
+            # scheduler stops weak trials after grace_period epochs
+            result_grid = model.tune(
+                data='config/observo.yaml',
+                epochs=epochs,
+                iterations=iterations,
+                optimizer='AdamW',
+                use_ray=True,
+                grace_period=10,
+                gpu_per_trial=1
+            )
+            best = result_grid.get_best_result(metric='metrics/mAP50-95(B)', mode='max')
+            tuned = {k: v for k, v in best.config.items() if k != 'data'}
+            self.log("✅ Tuned hyperparameters loaded from Ray Tune")
+            return tuned
+        
+        # The GA only needs to rank configs, so each trial skips per-epoch
+        # validation (the final epoch is still scored) and trains on a
+        # subset, fitting about three times the iterations in the same time
+        model.tune(
+            data='config/observo.yaml',
+            epochs=epochs,
+            iterations=iterations,
+            optimizer='AdamW',
+            plots=False,
+            save=False,
+            val=False,
+            fraction=0.3,
+            project='runs/tune',
+            name='perfect_90plus'
+        )
+        
+        # The tuner may suffix the run name, so take the newest result
+        candidates = glob.glob('runs/tune/perfect_90plus*/tune_results.csv')
+        if not candidates:
+            self.log("No tuning results found, keeping hand-tuned values", "WARNING")
+            return {}
+        
+        results_path = max(candidates, key=os.path.getmtime)
+        with open(results_path, 'r', encoding='utf-8', newline='') as f:
+            trials = [{k.strip(): float(v) for k, v in row.items()} for row in csv.DictReader(f)]
+        if not trials:
+            self.log("Tuning produced no trials, keeping hand-tuned values", "WARNING")
+            return {}
+        trials.sort(key=lambda trial: trial['fitness'], reverse=True)
+        
+        # Proxy fitness is noisy; full-data training with validation
+        # decides between the strongest few
+        best_fitness, tuned = None, None
+        for rank, trial in enumerate(trials[:max(1, finalists)], 1):
+            hyp = {k: v for k, v in trial.items() if k != 'fitness'}
+            if finalists <= 1:
+                tuned = hyp
+                break
+            
+            self.log(f"Re-training finalist {rank}/{finalists} (proxy fitness {trial['fitness']:.4f})...")
+            metrics = YOLO('yolov8n.pt').train(
+                data='config/observo.yaml',
+                epochs=finalist_epochs,
+                optimizer='AdamW',
+                plots=False,
+                val=True,
+                project='runs/tune',
+                name=f'perfect_90plus_finalist{rank}',
+                **hyp
+            )
+            if best_fitness is None or metrics.fitness > best_fitness:
+                best_fitness, tuned = metrics.fitness, hyp
+        
+        self.log(f"✅ Tuned hyperparameters selected from {results_path}")
+        return tuned
+    
+    def create_perfect_hyperparameters(self, tune=False, tune_iterations=300, use_ray=False):
         """Create hyperparameters optimized for 90%+ accuracy"""
         self.log("Creating perfect hyperparameters for 90%+ accuracy...")
         
@@ -46,16 +189,20 @@ class PerfectIntegrationOptimizer:
             'hsv_h': 0.02,   # Subtle hue changes
             'hsv_s': 0.8,    # Strong saturation augmentation
             'hsv_v': 0.5,    # Value augmentation
-            'degrees': 15.0, # More rotation variety
+            # Rotation, shear, perspective, mixup and copy-paste are off: GA
+            # searches settle on 0 for them on detection, and mixup and
+            # copy-paste are the costliest dataloader steps at imgsz 1024.
+            # --tune still explores them through the default search space
+            'degrees': 0.0,
             'translate': 0.25, # Increased translation
             'scale': 0.95,   # Scale augmentation
-            'shear': 3.0,    # More shear transformation
-            'perspective': 0.0002, # Perspective augmentation
+            'shear': 0.0,
+            'perspective': 0.0,
             'flipud': 0.6,   # Higher vertical flip
             'fliplr': 0.6,   # Higher horizontal flip
             'mosaic': 1.0,   # Full mosaic augmentation
-            'mixup': 0.2,    # Increased mixup
-            'copy_paste': 0.4, # Enhanced copy-paste
+            'mixup': 0.0,
+            'copy_paste': 0.0,
             
             # Perfect optimization settings
             'anchor_t': 5.0,  # Optimized anchor threshold
@@ -81,14 +228,22 @@ class PerfectIntegrationOptimizer:
             'verbose': True,
         }
         
+        # Evolved values replace the hand-picked ones they cover; settings
+        # outside the search space (optimizer, schedule, seed) are kept
+        if tune:
+            perfect_hyp.update(self.tune_perfect_hyperparameters(iterations=tune_iterations, use_ray=use_ray))
+        
         # Save perfect hyperparameters
         config_path = "config/hyp_perfect_90plus.yaml"
         os.makedirs("config", exist_ok=True)
         
-        with open(config_path, 'w', encoding='utf-8') as f:
-            yaml.dump(perfect_hyp, f, default_flow_style=False, sort_keys=False)
-        
-        self.log(f"✅ Perfect hyperparameters saved: {config_path}")
+        # Emit to a string first so the file gets a single write, and none
+        # at all when the hyperparameters have not changed
+        if _write_if_changed(config_path, yaml.dump(perfect_hyp, Dumper=SafeDumper,
+                                                    default_flow_style=False, sort_keys=False)):
+            self.log(f"✅ Perfect hyperparameters saved: {config_path}")
+        else:
+            self.log(f"Perfect hyperparameters unchanged: {config_path}")
         return config_path
     
     def create_perfect_training_script(self):
@@ -101,12 +256,119 @@ Multi-stage training with progressive optimization
 """
 
 import os
+import glob
+import psutil
 import torch
 import yaml
 from ultralytics import YOLO
 from datetime import datetime
 import shutil
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Ultralytics resolves relative dataset paths against the YAML file, so it
+# is handed the path; the script's own lookups use the copy parsed here
+DATA_YAML = 'config/observo.yaml'
+with open(DATA_YAML, 'r', encoding='utf-8') as f:
+    _DATA_CFG = yaml.load(f, Loader=SafeLoader)
+
+# The API predicts on an engine at Ultralytics' default 640 (engines carry
+# no training imgsz) in micro-batches of up to 16 images
+ENGINE_IMGSZ = 640
+ENGINE_MAX_BATCH = 16
+
+def _choose_cache(imgsz):
+    """'ram' when the decoded training images fit comfortably in free memory, else 'disk'"""
+    train_dir = os.path.join(_DATA_CFG.get('path') or os.path.dirname(DATA_YAML), _DATA_CFG['train'])
+    try:
+        with os.scandir(train_dir) as it:
+            n_images = sum(1 for entry in it if entry.is_file())
+    except OSError:
+        return 'disk'
+    
+    # RAM caching keeps every image decoded at imgsz, 3 bytes per pixel
+    dataset_bytes = n_images * imgsz * imgsz * 3
+    return 'ram' if dataset_bytes < 0.7 * psutil.virtual_memory().available else 'disk'
+
+def _plateau_stopper(patience, min_map50=0.85):
+    """on_fit_epoch_end callback that ends a stage once mAP50 is high and fitness has stopped improving"""
+    state = {'best_fitness': 0.0, 'best_map50': 0.0, 'stale': 0}
+    
+    def on_fit_epoch_end(trainer):
+        # Fitness (mostly mAP50-95) is less noisy epoch to epoch than mAP50,
+        # so it does not escalate on a lucky or unlucky validation pass
+        fitness = trainer.fitness or 0.0
+        state['best_map50'] = max(state['best_map50'], trainer.metrics.get('metrics/mAP50(B)', 0.0))
+        if fitness > state['best_fitness']:
+            state['best_fitness'] = fitness
+            state['stale'] = 0
+        else:
+            state['stale'] += 1
+        
+        # The next stage continues from this stage's best.pt at a larger
+        # image size, so the flat tail of this one is wasted time
+        if state['stale'] >= patience and state['best_map50'] > min_map50:
+            trainer.stop = True
+    
+    return on_fit_epoch_end
+
+def _fitness(box):
+    """Ultralytics' model fitness, 0.1*mAP50 + 0.9*mAP50-95, which tracks final quality better than mAP50"""
+    return 0.1 * box.map50 + 0.9 * box.map
+
+def _average_checkpoints(weights_dir, count=5):
+    """Average the last periodic checkpoints of a run into swa.pt; None when there are too few"""
+    paths = sorted(glob.glob(os.path.join(weights_dir, 'epoch*.pt')),
+                   key=lambda p: int(os.path.basename(p)[5:-3]))[-count:]
+    if len(paths) < 2:
+        return None
+    
+    ckpts = [torch.load(p, map_location='cpu', weights_only=False) for p in paths]
+    states = [(c['ema'] if c.get('ema') is not None else c['model']).float().state_dict()
+              for c in ckpts]
+    
+    # Floating-point tensors are averaged; integer buffers such as
+    # num_batches_tracked are kept from the newest checkpoint
+    averaged = dict(states[-1])
+    for key, value in averaged.items():
+        if value.is_floating_point():
+            averaged[key] = sum(s[key] for s in states) / len(states)
+    
+    ckpt = ckpts[-1]
+    key = 'ema' if ckpt.get('ema') is not None else 'model'
+    model = ckpt[key].float()
+    model.load_state_dict(averaged)
+    ckpt[key] = model.half()
+    ckpt['optimizer'] = None
+    
+    swa_path = os.path.join(weights_dir, 'swa.pt')
+    torch.save(ckpt, swa_path)
+    return swa_path
+
+def _link_or_copy(src, dst):
+    """Publish src at dst as a hardlink, copying only when they sit on different filesystems"""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    # Swap atomically so a server loading the model never sees a partial file
+    os.replace(tmp, dst)
+
+def _use_channels_last(trainer):
+    """Switch the model and its EMA copy to NHWC so AMP convolutions use tensor-core kernels"""
+    trainer.model.to(memory_format=torch.channels_last)
+    if trainer.ema is not None:
+        trainer.ema.ema.to(memory_format=torch.channels_last)
+
 class PerfectTrainer:
     def __init__(self):
         self.target_map50 = 0.90
@@ -156,12 +418,28 @@ class PerfectTrainer:
         # Load model
         model = YOLO(model_path)
         
+        # AMP runs on tensor cores; TF32 and an NHWC layout keep them fed.
+        # torch.compile is left out: it renames state_dict keys, which breaks
+        # Ultralytics' weight transfer and checkpointing
+        if torch.cuda.is_available():
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            model.add_callback('on_pretrain_routine_end', _use_channels_last)
+        
+        # Move on to the next stage after half the patience without gains
+        model.add_callback('on_fit_epoch_end', _plateau_stopper(max(1, stage_config['patience'] // 2)))
+        
         # Training parameters
         train_name = f"perfect_stage{stage_num}"
         
+        # Decoding is the bottleneck at these image sizes: cache decoded
+        # images in RAM when they fit and feed the GPU from more workers
+        cache = _choose_cache(stage_config['imgsz'])
+        self.log(f"🗄️ Image cache: {cache}")
+        
         try:
             results = model.train(
-                data='config/observo.yaml',
+                data=DATA_YAML,
                 epochs=stage_config['epochs'],
                 batch=stage_config['batch'],
                 imgsz=stage_config['imgsz'],
@@ -169,7 +447,8 @@ class PerfectTrainer:
                 name=train_name,
                 patience=stage_config['patience'],
                 save_period=10,
-                cache=True,
+                cache=cache,
+                workers=min(16, os.cpu_count() or 1),
                 amp=True,
                 fraction=1.0,
                 multi_scale=True,
@@ -192,43 +471,66 @@ class PerfectTrainer:
             if os.path.exists(best_model_path):
                 # Load and evaluate
                 best_model = YOLO(best_model_path)
-                val_results = best_model.val(data='config/observo.yaml')
+                val_results = best_model.val(data=DATA_YAML)
                 
                 map50 = val_results.box.map50
+                fitness = _fitness(val_results.box)
                 self.log(f"✅ {stage_config['name']} completed!")
                 self.log(f"📊 mAP50: {map50:.4f} ({map50*100:.2f}%)")
                 
                 if map50 >= self.target_map50:
                     self.log(f"🎉 TARGET ACHIEVED! {map50*100:.2f}% >= 90%")
-                    return True, map50
+                    return True, map50, fitness
                 
-                return False, map50
+                return False, map50, fitness
             else:
                 self.log(f"❌ Best model not found for {stage_config['name']}")
-                return False, 0.0
+                return False, 0.0, 0.0
                 
         except Exception as e:
             self.log(f"❌ Stage {stage_num} failed: {e}")
-            return False, 0.0
+            return False, 0.0, 0.0
+    
+    def export_engine(self):
+        """Export PERFECT_90PLUS_MODEL.pt to an FP16 TensorRT engine next to it for serving"""
+        weights = 'models/weights/PERFECT_90PLUS_MODEL.pt'
+        if not torch.cuda.is_available() or not os.path.exists(weights):
+            self.log("⏭️ Skipping TensorRT export (no CUDA device or no model)")
+            return None
+        
+        # dynamic makes the batch dimension variable up to batch; the input
+        # height and width stay fixed at imgsz
+        try:
+            engine = YOLO(weights).export(format='engine', half=True, dynamic=True,
+                                          batch=ENGINE_MAX_BATCH, imgsz=ENGINE_IMGSZ, workspace=4)
+        except Exception as e:
+            self.log(f"⚠️ TensorRT export failed, serving stays on PyTorch: {e}")
+            return None
+        
+        self.log(f"⚡ TensorRT engine exported: {engine}")
+        return engine
     
     def run_perfect_training(self):
         """Run multi-stage perfect training"""
         self.log("🎯 PERFECT TRAINING FOR 90%+ mAP50")
         self.log("=" * 60)
         
+        # The published model is chosen on fitness; mAP50 of that model is
+        # what gets reported against the target
         best_map50 = 0.0
+        best_fitness = 0.0
         
         for i, stage in enumerate(self.stages, 1):
-            success, map50 = self.train_stage(stage, i)
+            success, map50, fitness = self.train_stage(stage, i)
             
-            if map50 > best_map50:
+            if fitness > best_fitness:
+                best_fitness = fitness
                 best_map50 = map50
                 
                 # Copy best model to standard location
                 stage_best = f'runs/train/perfect_stage{i}/weights/best.pt'
                 if os.path.exists(stage_best):
-                    os.makedirs('models/weights', exist_ok=True)
-                    shutil.copy2(stage_best, 'models/weights/PERFECT_90PLUS_MODEL.pt')
+                    _link_or_copy(stage_best, 'models/weights/PERFECT_90PLUS_MODEL.pt')
                     self.log(f"📁 Best model updated: PERFECT_90PLUS_MODEL.pt")
             
             if success:
@@ -237,6 +539,21 @@ class PerfectTrainer:
             
             self.log(f"📈 Stage {i} best: {map50*100:.2f}%, continuing...")
         
+        # Averaging the last checkpoints of the final stage gives the
+        # robustness TTA bought at inference for a single forward pass
+        swa_path = _average_checkpoints(f'runs/train/perfect_stage{i}/weights')
+        if swa_path:
+            swa_box = YOLO(swa_path).val(data=DATA_YAML).box
+            self.log(f"🧮 Averaged weights mAP50: {swa_box.map50*100:.2f}%")
+            if _fitness(swa_box) >= best_fitness:
+                best_fitness = _fitness(swa_box)
+                best_map50 = swa_box.map50
+                _link_or_copy(swa_path, 'models/weights/PERFECT_90PLUS_MODEL.pt')
+                self.log(f"📁 Best model updated: PERFECT_90PLUS_MODEL.pt (averaged)")
+        
+        # The API serves from the engine when it exists
+        self.export_engine()
+        
         self.log(f"\\n🏆 FINAL RESULTS:")
         self.log(f"   Best mAP50: {best_map50:.4f} ({best_map50*100:.2f}%)")
         
@@ -262,26 +579,24 @@ if __name__ == "__main__":
 '''
         
         script_path = "src/train_perfect_90plus.py"
-        with open(script_path, 'w', encoding='utf-8') as f:
-            f.write(script_content)
-        
-        self.log(f"✅ Perfect training script created: {script_path}")
+        if _write_if_changed(script_path, script_content):
+            self.log(f"✅ Perfect training script created: {script_path}")
+        else:
+            self.log(f"Perfect training script unchanged: {script_path}")
         return script_path
     
     def optimize_model_api_integration(self):
         """Optimize the model API for perfect integration"""
         self.log("Optimizing model API for perfect integration...")
         
-        # Read current model API
-        api_path = "src/model_api.py"
-        with open(api_path, 'r') as f:
-            content = f.read()
-        
         # Add perfect model configuration
         perfect_model_config = '''
     'perfect_90plus': {
         'name': 'Perfect 90%+ Model',
-        'path': 'models/weights/PERFECT_90PLUS_MODEL.pt',
+        # TensorRT engine exported by the perfect trainer, .pt without a GPU build
+        'path': ('models/weights/PERFECT_90PLUS_MODEL.engine'
+                 if os.path.exists('models/weights/PERFECT_90PLUS_MODEL.engine')
+                 else 'models/weights/PERFECT_90PLUS_MODEL.pt'),
         'description': 'Perfect accuracy model - 90%+ mAP50 with all 7 safety classes',
         'performance': {
             'mAP50': 0.90,
@@ -293,25 +608,7 @@ if __name__ == "__main__":
         'status': 'production',
         'confidence_threshold': 0.25,  # Optimized threshold
         'nms_threshold': 0.45  # Optimized NMS
-    },'''
-        
-        # Insert the perfect model config
-        if 'perfect_90plus' not in content:
-            # Find the MODELS_CONFIG section and add our perfect model
-            config_start = content.find("MODELS_CONFIG = {")
-            if config_start != -1:
-                # Find the end of the first model config
-                first_model_end = content.find("    },", config_start)
-                if first_model_end != -1:
-                    # Insert our perfect model config
-                    new_content = (content[:first_model_end + 6] + 
-                                 perfect_model_config + 
-                                 content[first_model_end + 6:])
-                    
-                    with open(api_path, 'w', encoding='utf-8') as f:
-                        f.write(new_content)
-                    
-                    self.log("✅ Perfect model configuration added to API")
+    }'''
         
         # Create enhanced prediction endpoint
         enhanced_predict = '''
@@ -344,7 +641,7 @@ def predict_perfect():
                        conf=confidence,
                        iou=0.45,  # Optimized NMS threshold
                        max_det=300,  # Allow more detections
-                       augment=True,  # Test-time augmentation
+                       augment=False,  # Weights are pre-averaged at training time
                        agnostic_nms=False)  # Class-specific NMS
         
         # Process results with enhanced accuracy
@@ -380,7 +677,7 @@ def predict_perfect():
             'detection_count': len(detections),
             'confidence_threshold': confidence,
             'optimizations_applied': [
-                'test_time_augmentation',
+                'averaged_weights',
                 'optimized_nms',
                 'enhanced_confidence_threshold',
                 'class_specific_nms'
@@ -393,222 +690,125 @@ def predict_perfect():
         return jsonify({'success': False, 'error': str(e)}), 500
 '''
         
-        # Add the perfect prediction endpoint if not exists
-        if '/api/predict/perfect' not in content:
-            # Find a good place to insert (before the health check)
-            health_check_pos = content.find("@app.route('/api/health'")
-            if health_check_pos != -1:
-                new_content = (content[:health_check_pos] + 
-                             enhanced_predict + '\n\n' + 
-                             content[health_check_pos:])
-                
-                with open(api_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                
-                self.log("✅ Perfect prediction endpoint added")
+        # Read current model API
+        api_path = "src/model_api.py"
+        with open(api_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # Re-runs find both already in place; skip the parse entirely
+        if "'perfect_90plus'" in content and "'/api/predict/perfect'" in content:
+            self.log("Model API already has the perfect model and endpoint")
+            return
+        
+        # Locate both edit points from one parse of the module instead of
+        # searching the text, so the edits land in the right place however
+        # the file is laid out
+        tree = ast.parse(content)
+        models_config = None
+        routes = set()
+        health_check = None
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(
+                    isinstance(target, ast.Name) and target.id == 'MODELS_CONFIG' for target in node.targets):
+                models_config = node.value
+            elif isinstance(node, ast.FunctionDef):
+                paths = _route_paths(node)
+                routes |= paths
+                if '/api/health' in paths:
+                    health_check = node
+        
+        # Split on the same line breaks as the tokenizer; str.splitlines
+        # also breaks on form feeds and Unicode separators
+        lines = io.StringIO(content, newline='').readlines()
+        line_starts = [0]
+        for line in lines:
+            line_starts.append(line_starts[-1] + len(line))
+        
+        # (offset, text) insertions, applied back to front
+        edits = []
+        
+        # Insert the perfect model config after the last entry
+        if isinstance(models_config, ast.Dict):
+            keys = {key.value for key in models_config.keys if isinstance(key, ast.Constant)}
+            if 'perfect_90plus' not in keys and models_config.values:
+                last = models_config.values[-1]
+                # end_col_offset counts UTF-8 bytes, not characters
+                end_line = lines[last.end_lineno - 1]
+                offset = line_starts[last.end_lineno - 1] + len(
+                    end_line.encode('utf-8')[:last.end_col_offset].decode('utf-8'))
+                # Reuse a trailing comma rather than doubling it
+                next_char = len(content) - len(content[offset:].lstrip())
+                if content[next_char:next_char + 1] == ',':
+                    edits.append((next_char + 1, perfect_model_config))
+                else:
+                    edits.append((offset, ',' + perfect_model_config))
+        
+        # Add the perfect prediction endpoint before the health check
+        if '/api/predict/perfect' not in routes and health_check is not None:
+            first_line = min(d.lineno for d in health_check.decorator_list)
+            edits.append((line_starts[first_line - 1], enhanced_predict.lstrip('\n') + '\n\n'))
+        
+        if edits:
+            for offset, text in sorted(edits, reverse=True):
+                content = content[:offset] + text + content[offset:]
+            
+            _write_if_changed(api_path, content)
+            
+            self.log(f"✅ Model API updated with {len(edits)} perfect-model change(s)")
     
     def optimize_frontend_integration(self):
         """Optimize frontend for perfect model integration"""
-        self.log("Optimizing frontend for perfect integration...")
-        
-        # Create perfect model selector component
-        perfect_selector = '''import React from 'react';
-
-interface PerfectModelSelectorProps {
-  onModelChange: (modelId: string) => void;
-  selectedModel: string;
-}
-
-export const PerfectModelSelector: React.FC<PerfectModelSelectorProps> = ({
-  onModelChange,
-  selectedModel
-}) => {
-  const perfectModels = [
-    {
-      id: 'perfect_90plus',
-      name: 'Perfect 90%+ Model',
-      description: 'Highest accuracy model with 90%+ mAP50',
-      accuracy: '90%+',
-      recommended: true
-    },
-    {
-      id: 'duality_final_gpu',
-      name: 'Duality Final GPU (7 Classes)',
-      description: 'GPU-trained high-performance model',
-      accuracy: '85%',
-      recommended: false
-    },
-    {
-      id: 'flagship',
-      name: 'FINAL_SELECTED_MODEL',
-      description: 'Main production model',
-      accuracy: '73%',
-      recommended: false
-    }
-  ];
-
-  return (
-    <div className="perfect-model-selector">
-      <h3>🎯 Perfect Model Selection</h3>
-      {perfectModels.map((model) => (
-        <div 
-          key={model.id}
-          className={`model-option ${selectedModel === model.id ? 'selected' : ''} ${model.recommended ? 'recommended' : ''}`}
-          onClick={() => onModelChange(model.id)}
-        >
-          <div className="model-header">
-            <span className="model-name">{model.name}</span>
-            {model.recommended && <span className="recommended-badge">🏆 RECOMMENDED</span>}
-          </div>
-          <div className="model-description">{model.description}</div>
-          <div className="model-accuracy">Accuracy: {model.accuracy}</div>
-        </div>
-      ))}
-    </div>
-  );
-};
-'''
+        # Imported here: jinja2 is half of this script's startup and only
+        # this step renders templates
+        import jinja2
         
-        # Save perfect model selector
-        selector_path = "Web_App_frontend/src/components/PerfectModelSelector.tsx"
-        with open(selector_path, 'w', encoding='utf-8') as f:
-            f.write(perfect_selector)
-        
-        self.log(f"✅ Perfect model selector created: {selector_path}")
+        self.log("Optimizing frontend for perfect integration...")
         
-        # Create perfect detection component
-        perfect_detection = '''import React, { useState } from 'react';
-import { PerfectModelSelector } from './PerfectModelSelector';
-
-interface PerfectDetectionProps {
-  onDetectionComplete: (results: any) => void;
-}
-
-export const PerfectDetection: React.FC<PerfectDetectionProps> = ({
-  onDetectionComplete
-}) => {
-  const [selectedModel, setSelectedModel] = useState('perfect_90plus');
-  const [confidence, setConfidence] = useState(0.25);
-  const [isProcessing, setIsProcessing] = useState(false);
-  const [uploadedImage, setUploadedImage] = useState<File | null>(null);
-
-  const handlePerfectDetection = async () => {
-    if (!uploadedImage) return;
-
-    setIsProcessing(true);
-    
-    const formData = new FormData();
-    formData.append('image', uploadedImage);
-    formData.append('model', selectedModel);
-    formData.append('confidence', confidence.toString());
-
-    try {
-      const response = await fetch('/api/predict/perfect', {
-        method: 'POST',
-        body: formData,
-      });
-
-      const results = await response.json();
-      
-      if (results.success) {
-        onDetectionComplete({
-          ...results,
-          perfectMode: true,
-          optimizationsApplied: results.optimizations_applied || []
-        });
-      } else {
-        console.error('Perfect detection failed:', results.error);
-      }
-    } catch (error) {
-      console.error('Perfect detection error:', error);
-    } finally {
-      setIsProcessing(false);
-    }
-  };
-
-  return (
-    <div className="perfect-detection">
-      <div className="perfect-header">
-        <h2>🎯 Perfect Detection System</h2>
-        <p>Achieve 90%+ accuracy with optimized models and settings</p>
-      </div>
-
-      <PerfectModelSelector 
-        selectedModel={selectedModel}
-        onModelChange={setSelectedModel}
-      />
-
-      <div className="perfect-settings">
-        <h4>🔧 Perfect Settings</h4>
-        <div className="confidence-control">
-          <label>Confidence Threshold: {confidence}</label>
-          <input
-            type="range"
-            min="0.1"
-            max="0.9"
-            step="0.05"
-            value={confidence}
-            onChange={(e) => setConfidence(parseFloat(e.target.value))}
-          />
-        </div>
-      </div>
-
-      <div className="image-upload">
-        <input
-          type="file"
-          accept="image/*"
-          onChange={(e) => setUploadedImage(e.target.files?.[0] || null)}
-        />
-      </div>
-
-      <button
-        className="perfect-detect-btn"
-        onClick={handlePerfectDetection}
-        disabled={!uploadedImage || isProcessing}
-      >
-        {isProcessing ? '🔄 Processing...' : '🎯 Run Perfect Detection'}
-      </button>
-
-      {selectedModel === 'perfect_90plus' && (
-        <div className="perfect-features">
-          <h4>✨ Perfect Features Active:</h4>
-          <ul>
-            <li>✅ Test-time augmentation</li>
-            <li>✅ Optimized NMS threshold</li>
-            <li>✅ Enhanced confidence scoring</li>
-            <li>✅ Class-specific NMS</li>
-            <li>✅ 90%+ mAP50 accuracy</li>
-          </ul>
-        </div>
-      )}
-    </div>
-  );
-};
-'''
+        # Models offered by the selector, best first
+        perfect_models = [
+            {'id': 'perfect_90plus', 'name': 'Perfect 90%+ Model',
+             'description': 'Highest accuracy model with 90%+ mAP50', 'accuracy': '90%+', 'recommended': True},
+            {'id': 'duality_final_gpu', 'name': 'Duality Final GPU (7 Classes)',
+             'description': 'GPU-trained high-performance model', 'accuracy': '85%', 'recommended': False},
+            {'id': 'flagship', 'name': 'FINAL_SELECTED_MODEL',
+             'description': 'Main production model', 'accuracy': '73%', 'recommended': False},
+        ]
         
-        # Save perfect detection component
-        detection_path = "Web_App_frontend/src/components/PerfectDetection.tsx"
-        with open(detection_path, 'w', encoding='utf-8') as f:
-            f.write(perfect_detection)
+        # The components live in templates/*.tsx.j2 and are rewritten only
+        # when the rendered output changes, so the bundler's incremental
+        # rebuild can skip them
+        env = jinja2.Environment(loader=jinja2.FileSystemLoader(str(self.project_root / 'templates')),
+                                 keep_trailing_newline=True, trim_blocks=True, lstrip_blocks=True)
+        components = [
+            ("Web_App_frontend/src/components/PerfectModelSelector.tsx",
+             env.get_template('PerfectModelSelector.tsx.j2').render(models=perfect_models)),
+            ("Web_App_frontend/src/components/PerfectDetection.tsx",
+             env.get_template('PerfectDetection.tsx.j2').render()),
+        ]
         
-        self.log(f"✅ Perfect detection component created: {detection_path}")
+        for path, rendered in components:
+            if _write_if_changed(path, rendered):
+                self.log(f"✅ Perfect component written: {path}")
+            else:
+                self.log(f"Perfect component unchanged: {path}")
     
-    def run_perfect_optimization(self):
+    def run_perfect_optimization(self, tune=False, tune_iterations=300, use_ray=False):
         """Run the complete perfect optimization process"""
         self.log("🎯 STARTING PERFECT INTEGRATION & DETECTION OPTIMIZATION")
         self.log("=" * 70)
         
-        # Step 1: Create perfect hyperparameters
-        hyp_path = self.create_perfect_hyperparameters()
-        
-        # Step 2: Create perfect training script
-        train_path = self.create_perfect_training_script()
-        
-        # Step 3: Optimize model API
-        self.optimize_model_api_integration()
-        
-        # Step 4: Optimize frontend
-        self.optimize_frontend_integration()
+        # The four steps write disjoint files, so they run side by side:
+        # hyperparameters, training script, model API and frontend
+        with ThreadPoolExecutor(max_workers=4) as ex:
+            futures = [
+                ex.submit(self.create_perfect_hyperparameters,
+                          tune=tune, tune_iterations=tune_iterations, use_ray=use_ray),
+                ex.submit(self.create_perfect_training_script),
+                ex.submit(self.optimize_model_api_integration),
+                ex.submit(self.optimize_frontend_integration),
+            ]
+            for future in futures:
+                future.result()
         
         self.log("✅ PERFECT OPTIMIZATION SETUP COMPLETE!")
         
@@ -636,14 +836,24 @@ export const PerfectDetection: React.FC<PerfectDetectionProps> = ({
         print("- Perfect frontend-backend integration")
         print("- Optimized detection thresholds")
         print("- Enhanced user experience")
-        print("- Test-time augmentation")
+        print("- Averaged checkpoint weights (single pass, no TTA)")
         print("- Class-specific NMS optimization")
         
         return True
 
 def main():
+    parser = argparse.ArgumentParser(description='Perfect Integration & Detection Optimizer')
+    parser.add_argument('--tune', action='store_true',
+                       help='Evolve hyperparameters with the Ultralytics tuner (runs training)')
+    parser.add_argument('--tune-iterations', type=int, default=300, help='Tuner iterations')
+    parser.add_argument('--ray', action='store_true',
+                       help='Tune with Ray Tune and ASHA early stopping (requires ray[tune])')
+    args = parser.parse_args()
+    
     optimizer = PerfectIntegrationOptimizer()
-    success = optimizer.run_perfect_optimization()
+    success = optimizer.run_perfect_optimization(
+        tune=args.tune, tune_iterations=args.tune_iterations, use_ray=args.ray
+    )
     
     if success:
         print("\n🎉 PERFECT OPTIMIZATION READY!")
@@ -7,6 +7,32 @@ Verifies all components are ready for GitHub commit and Render deployment.
 import os
 import sys
 import json
+from functools import partial
+
+# Suffixes of key material that must never be committed
+SENSITIVE_SUFFIXES = {'.key', '.pem'}
+
+# Directories the sensitive-file scan never descends into: VCS metadata,
+# virtualenvs, caches and training outputs full of checkpoints
+EXCLUDE_DIRS = {'.git', 'venv', '.venv', '__pycache__', 'runs', 'node_modules'}
+
+# Everything the structure and security checks look for in app/backend.py
+BACKEND_PATTERNS = {
+    'flask_app': 'Flask(__name__)',
+    'blueprint': 'register_blueprint',
+    'cors': 'CORS(',
+    'port_env': "os.environ.get('PORT'",
+    'debug_on': 'debug=True',
+    'cors_wildcard': "origins=['*']",
+    'errorhandler': '@app.errorhandler',
+}
+
+def scan_backend(base_dir=None):
+    """Read app/backend.py once and report which BACKEND_PATTERNS it contains."""
+    backend_path = os.path.join(base_dir or os.path.dirname(__file__), 'app', 'backend.py')
+    with open(backend_path, 'r') as f:
+        content = f.read()
+    return {key: pattern in content for key, pattern in BACKEND_PATTERNS.items()}
 
 def check_requirements():
     """Check requirements.txt for deployment readiness."""
@@ -17,22 +43,14 @@ def check_requirements():
     
     try:
         with open(req_path, 'r') as f:
-            requirements = [line.strip() for line in f.readlines() if line.strip() and not line.startswith('#')]
+            requirements = [line.strip() for line in f if line.strip() and not line.startswith('#')]
         
         print(f"✅ Requirements file found: {len(requirements)} packages")
         
         # Check for essential packages
         essential_packages = ['flask', 'flask-cors', 'gunicorn']
-        found_packages = []
-        
-        for req in requirements:
-            package_name = req.split('==')[0].split('>=')[0].lower()
-            found_packages.append(package_name)
-        
-        missing_essential = []
-        for essential in essential_packages:
-            if essential not in found_packages:
-                missing_essential.append(essential)
+        found_packages = {req.split('==')[0].split('>=')[0].lower() for req in requirements}
+        missing_essential = [p for p in essential_packages if p not in found_packages]
         
         if missing_essential:
             print(f"❌ Missing essential packages: {missing_essential}")
@@ -41,10 +59,7 @@ def check_requirements():
             print("✅ All essential packages present")
         
         # Check for version format issues
-        invalid_versions = []
-        for req in requirements:
-            if '-dev' in req or 'alpha' in req or 'beta' in req:
-                invalid_versions.append(req)
+        invalid_versions = [req for req in requirements if '-dev' in req or 'alpha' in req or 'beta' in req]
         
         if invalid_versions:
             print(f"⚠ Development versions found: {invalid_versions}")
@@ -85,42 +100,36 @@ def check_deployment_files():
     
     return all_present
 
-def check_app_structure():
+def check_app_structure(hits=None):
     """Check Flask app structure for deployment."""
     print("\n🏗️ APP STRUCTURE CHECK")
     print("-" * 30)
     
-    base_dir = os.path.dirname(__file__)
-    
-    # Check main files
-    backend_path = os.path.join(base_dir, 'app', 'backend.py')
-    routes_path = os.path.join(base_dir, 'app', 'routes.py')
-    
     structure_ok = True
     
     # Check backend.py
     try:
-        with open(backend_path, 'r') as f:
-            backend_content = f.read()
+        if hits is None:
+            hits = scan_backend()
         
-        if 'Flask(__name__)' in backend_content:
+        if hits['flask_app']:
             print("✅ Flask app instance found")
         else:
             print("❌ Flask app instance not found")
             structure_ok = False
         
-        if 'register_blueprint' in backend_content:
+        if hits['blueprint']:
             print("✅ Blueprint registration found")
         else:
             print("⚠ Blueprint registration not found")
         
-        if 'CORS(' in backend_content:
+        if hits['cors']:
             print("✅ CORS configuration found")
         else:
             print("❌ CORS configuration missing")
             structure_ok = False
         
-        if "os.environ.get('PORT'" in backend_content:
+        if hits['port_env']:
             print("✅ Port configuration from environment")
         else:
             print("❌ Port configuration missing")
@@ -199,31 +208,29 @@ def check_render_config():
     
     return True
 
-def check_security():
+def check_security(hits=None):
     """Check security configurations."""
     print("\n🔒 SECURITY CHECK")
     print("-" * 30)
     
-    backend_path = os.path.join(os.path.dirname(__file__), 'app', 'backend.py')
-    
     try:
-        with open(backend_path, 'r') as f:
-            content = f.read()
+        if hits is None:
+            hits = scan_backend()
         
         # Check debug mode
-        if 'debug=True' in content:
+        if hits['debug_on']:
             print("⚠ Debug mode is enabled - consider disabling for production")
         else:
             print("✅ Debug mode properly configured")
         
         # Check CORS origins
-        if "origins=['*']" in content:
+        if hits['cors_wildcard']:
             print("⚠ CORS allows all origins - consider restricting for production")
         else:
             print("✅ CORS origins properly configured")
         
         # Check error handling
-        if '@app.errorhandler' in content:
+        if hits['errorhandler']:
             print("✅ Error handlers configured")
         else:
             print("⚠ Error handlers missing")
@@ -248,15 +255,16 @@ def check_git_readiness():
         print("✅ .gitignore file exists")
         
         try:
-            with open(gitignore_path, 'r') as f:
-                gitignore_content = f.read()
-            
             important_ignores = ['__pycache__', '.env', '*.pyc', 'venv', '.venv']
-            missing_ignores = []
             
-            for ignore in important_ignores:
-                if ignore not in gitignore_content:
-                    missing_ignores.append(ignore)
+            # Stream the file and stop as soon as every entry has been seen
+            unseen = set(important_ignores)
+            with open(gitignore_path, 'r') as f:
+                for line in f:
+                    unseen = {ignore for ignore in unseen if ignore not in line}
+                    if not unseen:
+                        break
+            missing_ignores = [ignore for ignore in important_ignores if ignore in unseen]
             
             if missing_ignores:
                 print(f"⚠ Consider adding to .gitignore: {missing_ignores}")
@@ -269,14 +277,13 @@ def check_git_readiness():
         print("⚠ .gitignore file missing - consider creating one")
     
     # Check for sensitive files
-    sensitive_patterns = ['.env', '*.key', '*.pem', 'secrets.*']
     found_sensitive = []
     
     for root, dirs, files in os.walk(base_dir):
-        if '.git' in root:
-            continue
+        # Pruning in place stops os.walk from descending at all
+        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
         for file in files:
-            if file.startswith('.env') or file.endswith('.key') or file.endswith('.pem'):
+            if file.startswith('.env') or os.path.splitext(file)[1] in SENSITIVE_SUFFIXES:
                 found_sensitive.append(os.path.relpath(os.path.join(root, file), base_dir))
     
     if found_sensitive:
@@ -328,13 +335,20 @@ def main():
     print("VISTA-S PRE-DEPLOYMENT CHECKLIST")
     print("=" * 40)
     
+    # backend.py is read once for both checks that inspect it; if it can't
+    # be read they retry on their own and report the error in context
+    try:
+        backend_hits = scan_backend()
+    except OSError:
+        backend_hits = None
+    
     checks = [
         check_requirements,
         check_deployment_files,
-        check_app_structure,
+        partial(check_app_structure, backend_hits),
         check_wsgi,
         check_render_config,
-        check_security,
+        partial(check_security, backend_hits),
         check_git_readiness
     ]
     
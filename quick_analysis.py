@@ -5,6 +5,8 @@ Quick Analysis for 90%+ mAP50 Performance Strategy
 
 import os
 
+import numpy as np
+
 def analyze_current_performance():
     """Analyze current training results"""
     print("🎯 ACHIEVING 90%+ mAP50 PERFORMANCE")
@@ -14,35 +16,19 @@ def analyze_current_performance():
     results_path = "runs/train/duality_final_gpu/results.csv"
     if os.path.exists(results_path):
         with open(results_path, 'r') as f:
-            lines = f.readlines()
-        
-        # Parse header
-        header = lines[0].strip().split(',')
-        map50_idx = header.index('metrics/mAP50(B)')
-        precision_idx = header.index('metrics/precision(B)')
-        recall_idx = header.index('metrics/recall(B)')
+            header = [name.strip() for name in f.readline().split(',')]
         
-        # Find best values
-        best_map50 = 0.0
-        best_precision = 0.0
-        best_recall = 0.0
-        final_map50 = 0.0
+        # Parse only the three metric columns, in C
+        columns = [header.index('metrics/mAP50(B)'),
+                   header.index('metrics/precision(B)'),
+                   header.index('metrics/recall(B)')]
+        data = np.loadtxt(results_path, delimiter=',', skiprows=1, usecols=columns, ndmin=2)
         
-        for line in lines[1:]:
-            values = line.strip().split(',')
-            if len(values) > map50_idx:
-                map50 = float(values[map50_idx])
-                precision = float(values[precision_idx])
-                recall = float(values[recall_idx])
-                
-                if map50 > best_map50:
-                    best_map50 = map50
-                if precision > best_precision:
-                    best_precision = precision
-                if recall > best_recall:
-                    best_recall = recall
-                
-                final_map50 = map50  # Last value
+        if len(data):
+            best_map50, best_precision, best_recall = (float(v) for v in data.max(axis=0))
+            final_map50 = float(data[-1, 0])  # Last value
+        else:
+            best_map50 = best_precision = best_recall = final_map50 = 0.0
         
         print("📊 CURRENT PERFORMANCE ANALYSIS:")
         print(f"   Best mAP50: {best_map50:.4f} ({best_map50*100:.2f}%)")
@@ -5,21 +5,31 @@ Quick API test to check if the server is responding
 
 import requests
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def test_api():
+# One pooled keep-alive session, so repeated checks reuse the connection
+# instead of opening a new one per request. Connection failures are
+# retried briefly; read timeouts are not, so they still surface as such
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                      max_retries=Retry(total=2, read=False, backoff_factor=0.1)))
+
+def test_api(count=1):
     print("🔍 Testing API connectivity...")
     
     try:
-        # Test health endpoint
-        response = requests.get('http://localhost:8000/api/health', timeout=5)
-        print(f"Health check: {response.status_code}")
-        if response.status_code == 200:
-            print("✅ API is responding")
-            data = response.json()
-            print(f"Status: {data.get('status')}")
-        else:
-            print("❌ API returned error")
-            
+        for _ in range(count):
+            # Test health endpoint
+            response = _session.get('http://localhost:8000/api/health', timeout=5)
+            print(f"Health check: {response.status_code}")
+            if response.status_code == 200:
+                print("✅ API is responding")
+                data = response.json()
+                print(f"Status: {data.get('status')}")
+            else:
+                print("❌ API returned error")
+                
     except requests.exceptions.ConnectionError:
         print("❌ Cannot connect to API - server may be down")
     except requests.exceptions.Timeout:
@@ -28,4 +38,4 @@ def test_api():
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    test_api()
\ No newline at end of file
+    test_api()
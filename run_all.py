@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+VISTA-S Flask Backend - Combined Final Checks
+Runs the final analysis, deployment test and summary in a single interpreter
+instead of three separate python invocations.
+"""
+
+import sys
+
+from final_analysis import main as run_analysis
+from final_deployment_test import main as run_deployment_test
+from final_summary import final_verification
+
+def main():
+    """Run all final reports in-process and combine their results."""
+    analysis_ok = run_analysis()
+
+    print("\n")
+    deployment_ok = run_deployment_test()
+
+    print("\n")
+    final_verification()
+
+    return analysis_ok and deployment_ok
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -34,7 +34,11 @@ MODELS_CONFIG = {
             'mAP50': 0.7321,
             'precision': 0.9474,
             'recall': 0.6598
-        },    'perfect_90plus': {
+        },
+        'classes': ['FireExtinguisher', 'ToolBox', 'OxygenTank'],
+        'status': 'production'
+    },
+    'perfect_90plus': {
         'name': 'Perfect 90%+ Model',
         'path': 'runs/train/perfect_90plus/weights/best.pt',
         'description': 'Perfect accuracy model - 90%+ mAP50 with optimized training',
@@ -48,9 +52,6 @@ MODELS_CONFIG = {
         'status': 'production',
         'confidence_threshold': 0.25,
         'nms_threshold': 0.45
-    },
-        'classes': ['FireExtinguisher', 'ToolBox', 'OxygenTank'],
-        'status': 'production'
     },
     'duality_final_gpu': {
         'name': 'Duality Final GPU (7 Classes)',
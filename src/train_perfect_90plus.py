@@ -5,12 +5,119 @@ Multi-stage training with progressive optimization
 """
 
 import os
+import glob
+import psutil
 import torch
 import yaml
 from ultralytics import YOLO
 from datetime import datetime
 import shutil
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Ultralytics resolves relative dataset paths against the YAML file, so it
+# is handed the path; the script's own lookups use the copy parsed here
+DATA_YAML = 'config/observo.yaml'
+with open(DATA_YAML, 'r', encoding='utf-8') as f:
+    _DATA_CFG = yaml.load(f, Loader=SafeLoader)
+
+# The API predicts on an engine at Ultralytics' default 640 (engines carry
+# no training imgsz) in micro-batches of up to 16 images
+ENGINE_IMGSZ = 640
+ENGINE_MAX_BATCH = 16
+
+def _choose_cache(imgsz):
+    """'ram' when the decoded training images fit comfortably in free memory, else 'disk'"""
+    train_dir = os.path.join(_DATA_CFG.get('path') or os.path.dirname(DATA_YAML), _DATA_CFG['train'])
+    try:
+        with os.scandir(train_dir) as it:
+            n_images = sum(1 for entry in it if entry.is_file())
+    except OSError:
+        return 'disk'
+    
+    # RAM caching keeps every image decoded at imgsz, 3 bytes per pixel
+    dataset_bytes = n_images * imgsz * imgsz * 3
+    return 'ram' if dataset_bytes < 0.7 * psutil.virtual_memory().available else 'disk'
+
+def _plateau_stopper(patience, min_map50=0.85):
+    """on_fit_epoch_end callback that ends a stage once mAP50 is high and fitness has stopped improving"""
+    state = {'best_fitness': 0.0, 'best_map50': 0.0, 'stale': 0}
+    
+    def on_fit_epoch_end(trainer):
+        # Fitness (mostly mAP50-95) is less noisy epoch to epoch than mAP50,
+        # so it does not escalate on a lucky or unlucky validation pass
+        fitness = trainer.fitness or 0.0
+        state['best_map50'] = max(state['best_map50'], trainer.metrics.get('metrics/mAP50(B)', 0.0))
+        if fitness > state['best_fitness']:
+            state['best_fitness'] = fitness
+            state['stale'] = 0
+        else:
+            state['stale'] += 1
+        
+        # The next stage continues from this stage's best.pt at a larger
+        # image size, so the flat tail of this one is wasted time
+        if state['stale'] >= patience and state['best_map50'] > min_map50:
+            trainer.stop = True
+    
+    return on_fit_epoch_end
+
+def _fitness(box):
+    """Ultralytics' model fitness, 0.1*mAP50 + 0.9*mAP50-95, which tracks final quality better than mAP50"""
+    return 0.1 * box.map50 + 0.9 * box.map
+
+def _average_checkpoints(weights_dir, count=5):
+    """Average the last periodic checkpoints of a run into swa.pt; None when there are too few"""
+    paths = sorted(glob.glob(os.path.join(weights_dir, 'epoch*.pt')),
+                   key=lambda p: int(os.path.basename(p)[5:-3]))[-count:]
+    if len(paths) < 2:
+        return None
+    
+    ckpts = [torch.load(p, map_location='cpu', weights_only=False) for p in paths]
+    states = [(c['ema'] if c.get('ema') is not None else c['model']).float().state_dict()
+              for c in ckpts]
+    
+    # Floating-point tensors are averaged; integer buffers such as
+    # num_batches_tracked are kept from the newest checkpoint
+    averaged = dict(states[-1])
+    for key, value in averaged.items():
+        if value.is_floating_point():
+            averaged[key] = sum(s[key] for s in states) / len(states)
+    
+    ckpt = ckpts[-1]
+    key = 'ema' if ckpt.get('ema') is not None else 'model'
+    model = ckpt[key].float()
+    model.load_state_dict(averaged)
+    ckpt[key] = model.half()
+    ckpt['optimizer'] = None
+    
+    swa_path = os.path.join(weights_dir, 'swa.pt')
+    torch.save(ckpt, swa_path)
+    return swa_path
+
+def _link_or_copy(src, dst):
+    """Publish src at dst as a hardlink, copying only when they sit on different filesystems"""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    # Swap atomically so a server loading the model never sees a partial file
+    os.replace(tmp, dst)
+
+def _use_channels_last(trainer):
+    """Switch the model and its EMA copy to NHWC so AMP convolutions use tensor-core kernels"""
+    trainer.model.to(memory_format=torch.channels_last)
+    if trainer.ema is not None:
+        trainer.ema.ema.to(memory_format=torch.channels_last)
+
 class PerfectTrainer:
     def __init__(self):
         self.target_map50 = 0.90
@@ -60,12 +167,28 @@ class PerfectTrainer:
         # Load model
         model = YOLO(model_path)
         
+        # AMP runs on tensor cores; TF32 and an NHWC layout keep them fed.
+        # torch.compile is left out: it renames state_dict keys, which breaks
+        # Ultralytics' weight transfer and checkpointing
+        if torch.cuda.is_available():
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            model.add_callback('on_pretrain_routine_end', _use_channels_last)
+        
+        # Move on to the next stage after half the patience without gains
+        model.add_callback('on_fit_epoch_end', _plateau_stopper(max(1, stage_config['patience'] // 2)))
+        
         # Training parameters
         train_name = f"perfect_stage{stage_num}"
         
+        # Decoding is the bottleneck at these image sizes: cache decoded
+        # images in RAM when they fit and feed the GPU from more workers
+        cache = _choose_cache(stage_config['imgsz'])
+        self.log(f"🗄️ Image cache: {cache}")
+        
         try:
             results = model.train(
-                data='config/observo.yaml',
+                data=DATA_YAML,
                 epochs=stage_config['epochs'],
                 batch=stage_config['batch'],
                 imgsz=stage_config['imgsz'],
@@ -73,7 +196,8 @@ class PerfectTrainer:
                 name=train_name,
                 patience=stage_config['patience'],
                 save_period=10,
-                cache=True,
+                cache=cache,
+                workers=min(16, os.cpu_count() or 1),
                 amp=True,
                 fraction=1.0,
                 multi_scale=True,
@@ -96,43 +220,66 @@ class PerfectTrainer:
             if os.path.exists(best_model_path):
                 # Load and evaluate
                 best_model = YOLO(best_model_path)
-                val_results = best_model.val(data='config/observo.yaml')
+                val_results = best_model.val(data=DATA_YAML)
                 
                 map50 = val_results.box.map50
+                fitness = _fitness(val_results.box)
                 self.log(f"✅ {stage_config['name']} completed!")
                 self.log(f"📊 mAP50: {map50:.4f} ({map50*100:.2f}%)")
                 
                 if map50 >= self.target_map50:
                     self.log(f"🎉 TARGET ACHIEVED! {map50*100:.2f}% >= 90%")
-                    return True, map50
+                    return True, map50, fitness
                 
-                return False, map50
+                return False, map50, fitness
             else:
                 self.log(f"❌ Best model not found for {stage_config['name']}")
-                return False, 0.0
+                return False, 0.0, 0.0
                 
         except Exception as e:
             self.log(f"❌ Stage {stage_num} failed: {e}")
-            return False, 0.0
+            return False, 0.0, 0.0
+    
+    def export_engine(self):
+        """Export PERFECT_90PLUS_MODEL.pt to an FP16 TensorRT engine next to it for serving"""
+        weights = 'models/weights/PERFECT_90PLUS_MODEL.pt'
+        if not torch.cuda.is_available() or not os.path.exists(weights):
+            self.log("⏭️ Skipping TensorRT export (no CUDA device or no model)")
+            return None
+        
+        # dynamic makes the batch dimension variable up to batch; the input
+        # height and width stay fixed at imgsz
+        try:
+            engine = YOLO(weights).export(format='engine', half=True, dynamic=True,
+                                          batch=ENGINE_MAX_BATCH, imgsz=ENGINE_IMGSZ, workspace=4)
+        except Exception as e:
+            self.log(f"⚠️ TensorRT export failed, serving stays on PyTorch: {e}")
+            return None
+        
+        self.log(f"⚡ TensorRT engine exported: {engine}")
+        return engine
     
     def run_perfect_training(self):
         """Run multi-stage perfect training"""
         self.log("🎯 PERFECT TRAINING FOR 90%+ mAP50")
         self.log("=" * 60)
         
+        # The published model is chosen on fitness; mAP50 of that model is
+        # what gets reported against the target
         best_map50 = 0.0
+        best_fitness = 0.0
         
         for i, stage in enumerate(self.stages, 1):
-            success, map50 = self.train_stage(stage, i)
+            success, map50, fitness = self.train_stage(stage, i)
             
-            if map50 > best_map50:
+            if fitness > best_fitness:
+                best_fitness = fitness
                 best_map50 = map50
                 
                 # Copy best model to standard location
                 stage_best = f'runs/train/perfect_stage{i}/weights/best.pt'
                 if os.path.exists(stage_best):
-                    os.makedirs('models/weights', exist_ok=True)
-                    shutil.copy2(stage_best, 'models/weights/PERFECT_90PLUS_MODEL.pt')
+                    _link_or_copy(stage_best, 'models/weights/PERFECT_90PLUS_MODEL.pt')
                     self.log(f"📁 Best model updated: PERFECT_90PLUS_MODEL.pt")
             
             if success:
@@ -141,6 +288,21 @@ class PerfectTrainer:
             
             self.log(f"📈 Stage {i} best: {map50*100:.2f}%, continuing...")
         
+        # Averaging the last checkpoints of the final stage gives the
+        # robustness TTA bought at inference for a single forward pass
+        swa_path = _average_checkpoints(f'runs/train/perfect_stage{i}/weights')
+        if swa_path:
+            swa_box = YOLO(swa_path).val(data=DATA_YAML).box
+            self.log(f"🧮 Averaged weights mAP50: {swa_box.map50*100:.2f}%")
+            if _fitness(swa_box) >= best_fitness:
+                best_fitness = _fitness(swa_box)
+                best_map50 = swa_box.map50
+                _link_or_copy(swa_path, 'models/weights/PERFECT_90PLUS_MODEL.pt')
+                self.log(f"📁 Best model updated: PERFECT_90PLUS_MODEL.pt (averaged)")
+        
+        # The API serves from the engine when it exists
+        self.export_engine()
+        
         self.log(f"\n🏆 FINAL RESULTS:")
         self.log(f"   Best mAP50: {best_map50:.4f} ({best_map50*100:.2f}%)")
         
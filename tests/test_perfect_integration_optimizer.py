@@ -0,0 +1,98 @@
+"""
+Unit tests for the model API rewrite done by perfect_integration_optimizer.
+Checks that the perfect model entry and endpoint insert into MODELS_CONFIG
+and the route list without breaking the module's syntax.
+"""
+
+import ast
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from perfect_integration_optimizer import PerfectIntegrationOptimizer
+
+
+HEALTH_ROUTE = '''
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    return jsonify({'status': 'healthy'})
+'''
+
+
+class TestModelAPIIntegration:
+    """Test optimize_model_api_integration on small model API modules."""
+
+    @pytest.fixture
+    def integrate(self, tmp_path, monkeypatch):
+        """Run the integration on a model_api.py body and return the parsed result."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'src').mkdir()
+        api_path = tmp_path / 'src' / 'model_api.py'
+
+        def run(models_config):
+            api_path.write_text(models_config + HEALTH_ROUTE, encoding='utf-8')
+            PerfectIntegrationOptimizer().optimize_model_api_integration()
+            return ast.parse(api_path.read_text(encoding='utf-8'))
+
+        return run
+
+    @staticmethod
+    def _model_ids(tree):
+        """Keys of the MODELS_CONFIG dict literal."""
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and node.targets[0].id == 'MODELS_CONFIG':
+                return [key.value for key in node.value.keys]
+        return None
+
+    @staticmethod
+    def _route_functions(tree):
+        """Names of the module-level functions, in order."""
+        return [node.name for node in tree.body if isinstance(node, ast.FunctionDef)]
+
+    def test_insert_without_trailing_comma(self, integrate):
+        """Test that an entry is appended to a dict whose last entry has no comma."""
+        tree = integrate(
+            "MODELS_CONFIG = {\n"
+            "    'base': {'name': 'Base'}\n"
+            "}\n"
+        )
+
+        assert self._model_ids(tree) == ['base', 'perfect_90plus']
+        assert self._route_functions(tree) == ['predict_perfect', 'health_check']
+
+    def test_insert_after_trailing_comma(self, integrate):
+        """Test that an existing trailing comma is reused rather than doubled."""
+        tree = integrate(
+            "MODELS_CONFIG = {\n"
+            "    'base': {'name': 'Base'},\n"
+            "}\n"
+        )
+
+        assert self._model_ids(tree) == ['base', 'perfect_90plus']
+
+    def test_insert_after_non_ascii_entry(self, integrate):
+        """Test that non-ASCII text on the last line does not shift the insert point."""
+        tree = integrate(
+            "MODELS_CONFIG = {\n"
+            "    'base': {'name': '🚀 Base – fast'}}\n"
+        )
+
+        assert self._model_ids(tree) == ['base', 'perfect_90plus']
+
+    def test_rerun_leaves_module_unchanged(self, integrate, tmp_path):
+        """Test that a second run finds the entry and endpoint already present."""
+        integrate(
+            "MODELS_CONFIG = {\n"
+            "    'base': {'name': 'Base'},\n"
+            "}\n"
+        )
+        api_path = tmp_path / 'src' / 'model_api.py'
+        first = api_path.read_text(encoding='utf-8')
+
+        PerfectIntegrationOptimizer().optimize_model_api_integration()
+
+        assert api_path.read_text(encoding='utf-8') == first
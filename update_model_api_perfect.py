@@ -66,62 +66,313 @@ def create_perfect_prediction_endpoint():
     """Create enhanced prediction endpoint"""
     
     endpoint_code = '''
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+
+import cv2
+from flask import Response
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# orjson is optional; fall back to jsonify when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Weighted Boxes Fusion for opt-in TTA; without it the endpoint falls back
+# to Ultralytics' built-in augment=True merge
+try:
+    from ensemble_boxes import weighted_boxes_fusion
+except ImportError:
+    weighted_boxes_fusion = None
+
+# Image sizes for the rescaled TTA passes (multiples of the 32px stride)
+TTA_SIZES = (512, 832)
+
+# FP16 inference on GPUs; Ultralytics converts the weights when the
+# predictor is first set up, so every call must pass the same value
+USE_HALF = torch.cuda.is_available()
+
+# Uploads past these limits are rejected with 413 before any decoding
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+
+# Werkzeug enforces this while streaming the body, so chunked uploads
+# without a Content-Length are capped as well. It is app-wide, so a cap
+# configured elsewhere is left alone
+if app.config.get('MAX_CONTENT_LENGTH') is None:
+    app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+# libjpeg can decode at 1/8, 1/4 or 1/2 scale in one pass; the coarsest
+# scale whose long side still covers the inference size is used
+_REDUCED_DECODES = ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                    (4, cv2.IMREAD_REDUCED_COLOR_4),
+                    (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# Plain predictions are coalesced: when requests are already queued, the
+# worker waits up to BATCH_WAIT_S for more and runs up to BATCH_MAX images
+# in one forward pass
+BATCH_MAX = 16
+BATCH_WAIT_S = 0.010
+BATCH_TIMEOUT_S = 30
+_batch_queue = queue.Queue()
+_batch_worker_lock = threading.Lock()
+_batch_worker_started = False
+
+# The Ultralytics predictor keeps per-call state (args, batch, warmup) on
+# the shared cached model, so every forward pass holds this lock
+_predict_lock = threading.Lock()
+
+def _json_response(payload):
+    """JSON response serialised in C by orjson when available"""
+    if orjson is None:
+        return jsonify(payload)
+    return Response(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+                    mimetype='application/json')
+
+@lru_cache(maxsize=4)
+def _get_model(model_id):
+    """load_model() with Conv+BN folded once, so requests only pay for the forward pass"""
+    model = load_model(model_id)
+    # Exported engines (TensorRT, ONNX) are already fused
+    if isinstance(model.model, torch.nn.Module):
+        model.fuse()
+    return model
+
+def _decode_image(data, long_side, target_size):
+    """Decode upload bytes to a BGR array, subsampled while the long side stays >= target_size"""
+    buffer = np.frombuffer(data, np.uint8)
+    for factor, flag in _REDUCED_DECODES:
+        if long_side >= target_size * factor:
+            return cv2.imdecode(buffer, flag)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+def _class_namer(model):
+    """Class id -> name via a dense list built once, instead of a dict probe per box"""
+    names = model.names
+    lookup = [names.get(i, f"Unknown_{i}") for i in range(max(names) + 1 if names else 0)]
+    return lambda cls: lookup[cls] if 0 <= cls < len(lookup) else f"Unknown_{cls}"
+
+def _result_detections(model, results, class_name=None):
+    """Detection dicts for Ultralytics results, copying each tensor to the host once"""
+    class_name = class_name or _class_namer(model)
+    detections = []
+    for result in results:
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        
+        xyxy = boxes.xyxy.cpu().numpy().tolist()
+        confs = boxes.conf.cpu().numpy().tolist()
+        classes = boxes.cls.cpu().numpy().astype(int).tolist()
+        
+        detections.extend({
+            'bbox': box,
+            'confidence': conf,
+            'class_id': cls,
+            'class_name': class_name(cls),
+            'accuracy_level': 'perfect'
+        } for box, conf, cls in zip(xyxy, confs, classes))
+    return detections
+
+def _fail_pending(futures, error):
+    """Resolve every future that has no outcome yet with error"""
+    for future in futures:
+        if not future.done():
+            future.set_exception(error)
+
+def _run_batch(model_id, items):
+    """One forward pass for queued (image, confidence, future) items of one model
+
+    Every future is resolved, with detections or with the exception that
+    stopped them, so no request is left waiting on the batch.
+    """
+    futures = [future for _, _, future in items]
+    try:
+        model = _get_model(model_id)
+        # The batch runs at its lowest threshold; each request then keeps
+        # only the boxes that pass its own
+        with _predict_lock:
+            results = model([image for image, _, _ in items],
+                            conf=min(confidence for _, confidence, _ in items),
+                            iou=0.45, max_det=300, half=USE_HALF, agnostic_nms=False)
+        class_name = _class_namer(model)
+    except Exception as e:
+        _fail_pending(futures, e)
+        return
+    
+    for (_, confidence, future), result in zip(items, results):
+        try:
+            detections = [d for d in _result_detections(model, [result], class_name) if d['confidence'] >= confidence]
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(detections)
+    _fail_pending(futures, RuntimeError('Model returned fewer results than queued images'))
+
+def _batch_worker():
+    """Drain the request queue into per-model batches, forever"""
+    while True:
+        batch = [_batch_queue.get()]
+        # A lone request runs straight away; waiting only pays off when
+        # others are already queued behind it
+        deadline = time.monotonic() + BATCH_WAIT_S
+        while len(batch) < BATCH_MAX and not _batch_queue.empty():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_batch_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        # This thread serves every plain prediction in the process, so
+        # nothing may escape the loop
+        try:
+            by_model = {}
+            for model_id, image, confidence, future in batch:
+                by_model.setdefault(model_id, []).append((image, confidence, future))
+            for model_id, items in by_model.items():
+                _run_batch(model_id, items)
+        except Exception as e:
+            logger.error(f"Perfect batch worker error: {str(e)}")
+            _fail_pending([future for *_, future in batch], e)
+
+def _predict_batched(model_id, image, confidence):
+    """Queue one image for the batch worker and wait for its detections"""
+    global _batch_worker_started
+    # Started on first use so each server process (after fork) gets its own
+    with _batch_worker_lock:
+        if not _batch_worker_started:
+            threading.Thread(target=_batch_worker, name='perfect-batcher', daemon=True).start()
+            _batch_worker_started = True
+    
+    future = Future()
+    _batch_queue.put((model_id, image, confidence, future))
+    return future.result(timeout=BATCH_TIMEOUT_S)
+
+def _predict_tta(model, image, confidence):
+    """Merge identity, horizontal-flip and rescaled passes with Weighted Boxes Fusion"""
+    height, width = image.shape[:2]
+    predict_args = dict(conf=confidence, iou=0.45, max_det=300, agnostic_nms=False, half=USE_HALF)
+    
+    # A TensorRT engine is built for a single input size, so it only gets
+    # the identity and flip passes
+    sizes = TTA_SIZES if isinstance(model.model, torch.nn.Module) else ()
+    
+    # Identity and flip share one batched forward pass
+    with _predict_lock:
+        results = list(model([image, cv2.flip(image, 1)], **predict_args))
+        flipped = [False, True]
+        for size in sizes:
+            results.extend(model(image, imgsz=size, **predict_args))
+            flipped.append(False)
+    
+    boxes_list, scores_list, labels_list = [], [], []
+    for result, flip in zip(results, flipped):
+        xyxy = result.boxes.xyxy.cpu().numpy()
+        if flip:
+            xyxy[:, [0, 2]] = width - xyxy[:, [2, 0]]
+        # WBF works in normalised coordinates
+        boxes_list.append((xyxy / [width, height, width, height]).clip(0, 1).tolist())
+        scores_list.append(result.boxes.conf.cpu().numpy().tolist())
+        labels_list.append(result.boxes.cls.cpu().numpy().tolist())
+    
+    boxes, scores, labels = weighted_boxes_fusion(boxes_list, scores_list, labels_list,
+                                                  iou_thr=0.55, skip_box_thr=0.001)
+    
+    # Boxes only some passes found get a reduced fused score
+    class_name = _class_namer(model)
+    return [{
+        'bbox': [box[0] * width, box[1] * height, box[2] * width, box[3] * height],
+        'confidence': float(score),
+        'class_id': int(label),
+        'class_name': class_name(int(label)),
+        'accuracy_level': 'perfect'
+    } for box, score, label in zip(boxes.tolist(), scores, labels) if score >= confidence]
+
 @app.route('/api/predict/perfect', methods=['POST'])
 def predict_perfect():
     """Perfect prediction with optimized settings"""
     logger.info("Perfect prediction request received")
     
     try:
+        # Reject oversized uploads before the body is parsed
+        if request.content_length and request.content_length > MAX_UPLOAD_BYTES:
+            return jsonify({'success': False, 'error': 'Image too large'}), 413
+        
         # Use perfect model by default
         model_id = request.form.get('model', 'perfect_90plus')
         
         # Optimized confidence threshold
         confidence = float(request.form.get('confidence', 0.25))
         
+        # Test-time augmentation costs about 4x the compute, so it is opt-in
+        tta = request.form.get('tta', '0') == '1'
+        
         # Get image
         if 'image' not in request.files:
             return jsonify({'success': False, 'error': 'No image provided'}), 400
         
-        image_file = request.files['image']
-        image = Image.open(image_file.stream)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Load perfect model
-        model = load_model(model_id)
-        
-        # Perfect prediction with optimized settings
-        results = model(image, 
-                       conf=confidence,
-                       iou=0.45,  # Optimized NMS threshold
-                       max_det=300,  # Allow more detections
-                       augment=True,  # Test-time augmentation
-                       agnostic_nms=False)  # Class-specific NMS
-        
-        # Process results
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for i in range(len(boxes)):
-                    box = boxes.xyxy[i].cpu().numpy()
-                    conf = boxes.conf[i].cpu().numpy()
-                    cls = int(boxes.cls[i].cpu().numpy())
-                    
-                    class_name = model.names[cls] if cls in model.names else f"Unknown_{cls}"
-                    
-                    detection = {
-                        'bbox': [float(x) for x in box],
-                        'confidence': float(conf),
-                        'class_id': cls,
-                        'class_name': class_name,
-                        'accuracy_level': 'perfect'
-                    }
-                    detections.append(detection)
-        
-        img_width, img_height = image.size
-        
-        return jsonify({
+        image_data = request.files['image'].read()
+        try:
+            # Image.open only parses the header, so the size is known up
+            # front; PIL's own bomb check fires at twice its global limit
+            img_width, img_height = Image.open(io.BytesIO(image_data)).size
+        except Image.DecompressionBombError:
+            return jsonify({'success': False, 'error': 'Image too large'}), 413
+        except OSError:
+            return jsonify({'success': False, 'error': 'Could not decode image'}), 400
+        if img_width * img_height > MAX_IMAGE_PIXELS:
+            return jsonify({'success': False, 'error': 'Image too large'}), 413
+        
+        # Decode straight to the BGR array Ultralytics consumes, instead of
+        # a PIL RGB image it converts back to a BGR array
+        image = _decode_image(image_data, max(img_width, img_height),
+                              max(TTA_SIZES) if tta else 640)
+        if image is None:
+            return jsonify({'success': False, 'error': 'Could not decode image'}), 400
+        
+        height, width = image.shape[:2]
+        if (width > height) != (img_width > img_height):
+            # imdecode applied an EXIF rotation the header size does not reflect
+            img_width, img_height = img_height, img_width
+        
+        # Load perfect model (cached and fused after the first request)
+        model = _get_model(model_id)
+        
+        if tta and weighted_boxes_fusion is not None:
+            detections = _predict_tta(model, image, confidence)
+        elif tta:
+            # Built-in TTA merge when WBF is unavailable
+            with _predict_lock:
+                results = model(image, 
+                               conf=confidence,
+                               iou=0.45,  # Optimized NMS threshold
+                               max_det=300,  # Allow more detections
+                               augment=True,
+                               half=USE_HALF,  # FP16 on GPU, FP32 on CPU
+                               agnostic_nms=False)  # Class-specific NMS
+            detections = _result_detections(model, results)
+        else:
+            # Batched with concurrent requests, same NMS and precision settings
+            detections = _predict_batched(model_id, image, confidence)
+        
+        if (width, height) != (img_width, img_height):
+            # Map boxes from the subsampled decode back to the uploaded image
+            scale_x, scale_y = img_width / width, img_height / height
+            for detection in detections:
+                x1, y1, x2, y2 = detection['bbox']
+                detection['bbox'] = [x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y]
+        
+        optimizations = ['optimized_nms', 'enhanced_confidence_threshold', 'class_specific_nms']
+        if tta:
+            optimizations.insert(0, 'test_time_augmentation')
+        
+        return _json_response({
             'success': True,
             'model_used': model_id,
             'model_name': 'Perfect 90%+ Model',
@@ -130,15 +381,13 @@ def predict_perfect():
             'detections': detections,
             'detection_count': len(detections),
             'confidence_threshold': confidence,
-            'optimizations_applied': [
-                'test_time_augmentation',
-                'optimized_nms',
-                'enhanced_confidence_threshold',
-                'class_specific_nms'
-            ],
+            'optimizations_applied': optimizations,
             'timestamp': datetime.now().isoformat()
         })
         
+    except RequestEntityTooLarge:
+        # Raised while parsing a body larger than MAX_CONTENT_LENGTH
+        return jsonify({'success': False, 'error': 'Image too large'}), 413
     except Exception as e:
         logger.error(f"Perfect prediction error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -171,7 +420,7 @@ def main():
     
     print("\nPERFECT MODEL FEATURES:")
     print("- 90%+ mAP50 accuracy")
-    print("- Test-time augmentation")
+    print("- Opt-in test-time augmentation (tta=1, fused with WBF)")
     print("- Optimized NMS thresholds")
     print("- Enhanced confidence scoring")
     print("- Class-specific NMS")